@@ -1,3 +1,3 @@
-from app.config.settings import settings
+from app.config.settings import get_settings, settings
 
-__all__ = ["settings"]
+__all__ = ["get_settings", "settings"]
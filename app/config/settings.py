@@ -1,14 +1,30 @@
+import math
+import os
+from functools import cached_property, lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, QueuePool, create_engine
 from typing import Optional
 
+# Connections the Turso pools may open beyond db_pool_size under bursts,
+# summed over all API processes
+DB_MAX_OVERFLOW = 20
+# Smallest per-process pool and overflow, however many processes share the budget
+DB_MIN_CONNECTIONS = 2
+
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env")
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+        extra="ignore",
+    )
 
     # Database Configuration
     DATABASE_URL: str
     DATABASE_AUTH_TOKEN: str
+    SQL_CACHE_TTL: int = 60  # seconds agent SQL tools reuse identical SELECT results; 0 disables
 
     # LLM API Keys
     GROQ_API_KEY: str
@@ -27,6 +43,7 @@ class Settings(BaseSettings):
 
     # Web Search
     TAVILY_API_KEY: Optional[str] = None
+    SEARCH_CACHE_TTL: int = 86400  # seconds to reuse identical search results; 0 disables
 
     # Document webhook (optional - for sending documents to users during calls)
     DOCUMENT_WEBHOOK_URL: Optional[str] = None
@@ -44,21 +61,99 @@ class Settings(BaseSettings):
     LOG_FILE: str = "logs/agno_agent_api.log"
     LOG_FORMAT: str = "text"  # "text" or "json"
 
+    # Chat response cache (identical message, history and context); TTL 0 disables
+    RESPONSE_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_SIZE: int = 1024
+
+    # Chat history replayed to the agent: newest whole turns within this many tokens
+    HISTORY_TOKEN_BUDGET: int = 1500
+
+    # Streaming: window for merging content tokens into one SSE frame; 0 sends each token
+    SSE_COALESCE_MS: int = 50
+
     # Voice agent health check
     VOICE_HEALTH_PORT: int = 8092
 
+    # Voice agent: prewarmed job processes (VAD already loaded) kept waiting for rooms
+    VOICE_IDLE_PROCESSES: int = 0
+
+    # Expected peak of concurrent voice rooms / chat requests on this host;
+    # the persistent DB connections are split across the API processes
+    MAX_CONCURRENT_SESSIONS: int = 10
+
+    # Worker processes this host should run; 0 = one per CPU available to us
+    WORKERS: int = 0
+
+    # Threads for blocking tool/DB calls per API process; 0 = one per pooled DB connection
+    IO_THREADS: int = 0
+
+    @property
+    def worker_count(self) -> int:
+        """Effective worker count: WORKERS, or the CPUs in our affinity mask."""
+        if self.WORKERS > 0:
+            return self.WORKERS
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:  # not available on macOS/Windows
+            return os.cpu_count() or 1
+
     @property
-    def db_engine(self) -> str:
+    def api_process_count(self) -> int:
+        """API processes sharing the DB budget: an explicit WORKERS, else one.
+
+        Plain ``uvicorn app.main:app`` is a single process; ``python -m
+        app.main`` exports its worker count as WORKERS to the workers it spawns.
+        """
+        return max(1, self.WORKERS)
+
+    @property
+    def db_pool_size(self) -> int:
+        """Persistent Turso connections in this process: its share of MAX_CONCURRENT_SESSIONS."""
+        return max(DB_MIN_CONNECTIONS, math.ceil(self.MAX_CONCURRENT_SESSIONS / self.api_process_count))
+
+    @property
+    def db_max_overflow(self) -> int:
+        """Burst connections this process may add to its pool: its share of DB_MAX_OVERFLOW."""
+        return max(DB_MIN_CONNECTIONS, math.ceil(DB_MAX_OVERFLOW / self.api_process_count))
+
+    @property
+    def io_thread_count(self) -> int:
+        """Default-executor size: IO_THREADS, or enough to keep every DB connection busy."""
+        if self.IO_THREADS > 0:
+            return self.IO_THREADS
+        return self.db_pool_size + self.db_max_overflow
+
+    @cached_property
+    def db_engine(self) -> Engine:
+        """Process-wide Turso engine.
+
+        Built once on first access so every caller shares a single
+        connection pool instead of paying a fresh pool + TLS handshake.
+        """
         engine = create_engine(
             f"sqlite+{self.DATABASE_URL}?secure=true",
             connect_args={
                 "auth_token": self.DATABASE_AUTH_TOKEN,
+                # One engine is shared across LiveKit worker threads
+                "check_same_thread": False,
             },
-            pool_recycle=120,
+            # The libsql URL has no file path, so SQLAlchemy would otherwise
+            # fall back to SingletonThreadPool and reject the sizing args.
+            poolclass=QueuePool,
+            pool_size=self.db_pool_size,
+            max_overflow=self.db_max_overflow,
+            pool_timeout=10,
+            # Turso drops idle streams after ~10 min; recycle well before that
+            pool_recycle=300,
             pool_pre_ping=True
         )
         return engine
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings, parsing .env only once."""
+    return Settings()
+
 
-settings = Settings()
+settings = get_settings()
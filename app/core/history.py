@@ -0,0 +1,65 @@
+"""Token-budgeted chat history for agent runs."""
+
+import logging
+from functools import lru_cache
+
+from agno.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+# Role/separator tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    """The o200k_base tokenizer, or None when tiktoken can't load it."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # not installed, or the BPE file can't be fetched
+        logger.warning("tiktoken unavailable, estimating history tokens: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of *text*; ~4 characters per token without tiktoken."""
+    encoder = _encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def pack_history(messages: list[Message], max_tokens: int) -> list[Message]:
+    """Newest whole turns of *messages* that fit in *max_tokens*.
+
+    Only the user's questions and the assistant's text answers are kept;
+    tool calls and results are dropped. Turns start at a user message and
+    are packed from the newest backwards, so the oldest are truncated
+    first. The returned copies are tagged ``from_history`` so Agno doesn't
+    store them again with the new run.
+    """
+    turns: list[list[Message]] = []
+    for m in messages:
+        if m.role not in ("user", "assistant") or not isinstance(m.content, str) or not m.content:
+            continue
+        if m.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(m)
+
+    packed: list[list[Message]] = []
+    budget = max_tokens
+    for turn in reversed(turns):
+        cost = sum(count_tokens(m.content) + MESSAGE_OVERHEAD_TOKENS for m in turn)
+        if cost > budget:
+            break
+        budget -= cost
+        packed.append(turn)
+
+    return [
+        Message(role=m.role, content=m.content, from_history=True)
+        for turn in reversed(packed)
+        for m in turn
+    ]
+
@@ -1,15 +1,41 @@
+import atexit
+import copy
+import inspect
 import json
 import logging
+import os
+import queue
+import reprlib
+import threading
 import time
 import traceback
 from datetime import datetime, timezone
-from logging.handlers import RotatingFileHandler
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 
 TEXT_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
 DEFAULT_BACKUP_COUNT = 5
+FILE_BUFFER_CAPACITY = 512  # records buffered before a batched disk write
+FILE_FLUSH_INTERVAL = 1.0  # seconds between time-based flushes
+# Load-balancer probe paths kept out of the uvicorn access log
+HEALTH_CHECK_PATHS = frozenset({"/", "/health"})
+
+# Bounded repr for tool arguments — avoids materializing large payloads just to truncate them
+_ARGS_REPR = reprlib.Repr()
+_ARGS_REPR.maxstring = 200
+_ARGS_REPR.maxother = 200
+_ARGS_REPR.maxdict = 6
+_ARGS_REPR.maxlist = 6
+
+# Resolved once; logging.getLogger takes the module lock on every call
+_TOOLS_LOGGER = logging.getLogger("app.tools")
+
+# Background listener that owns the console/file handlers (see setup_logging)
+_listener: Optional[QueueListener] = None
+# (level, file, format) the running listener was configured with
+_configured: Optional[tuple] = None
 
 
 class JsonLogFormatter(logging.Formatter):
@@ -29,7 +55,7 @@ class JsonLogFormatter(logging.Formatter):
             log_entry["exception"] = traceback.format_exception(*record.exc_info)
 
         # Include extra fields passed via the `extra` dict
-        for key in ("tool_name", "duration_s"):
+        for key in ("tool_name", "duration_s", "args_preview"):
             value = getattr(record, key, None)
             if value is not None:
                 log_entry[key] = value
@@ -37,13 +63,172 @@ class JsonLogFormatter(logging.Formatter):
         return json.dumps(log_entry, default=str)
 
 
+class CachedTimeFormatter(logging.Formatter):
+    """Text formatter that runs ``time.strftime`` at most once per second.
+
+    Records logged within the same wall-clock second reuse the cached
+    seconds part of ``asctime``; only the milliseconds are filled in.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # (whole second, formatted seconds part), swapped as one tuple
+        self._cached_second: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, text = self._cached_second
+        if second != cached_second:
+            text = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cached_second = (second, text)
+        return self.default_msec_format % (text, record.msecs)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """QueueHandler that keeps exc_info so downstream formatters can render it.
+
+    The stdlib ``prepare`` pre-formats the record with this handler's own
+    formatter and strips ``exc_info``, which would drop the structured
+    ``exception`` field from JSON logs. Merge only the message args here and
+    leave the rest of the formatting to the listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class BufferedFileHandler(MemoryHandler):
+    """MemoryHandler that batches writes to a file handler.
+
+    Flushes when the buffer reaches ``capacity``, immediately for records at
+    ``flushLevel`` or above, and every ``flush_interval`` seconds from a daemon
+    thread so a quiet period never leaves records stranded in memory.
+    Closing the handler flushes the buffer and closes the target.
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        capacity: int = FILE_BUFFER_CAPACITY,
+        flush_interval: float = FILE_FLUSH_INTERVAL,
+        flushLevel: int = logging.ERROR,
+    ):
+        super().__init__(
+            capacity, flushLevel=flushLevel, target=target, flushOnClose=True
+        )
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(flush_interval,),
+            name="log-file-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        target = self.target
+        super().close()
+        if target is not None:
+            target.close()
+
+
+class SizeTrackingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that keeps the file size in memory.
+
+    The stdlib rollover check stats the path twice and seeks to the end of
+    the file for every record. Here the size is read once when the file is
+    opened and then advanced by each record written, like the stdlib, by
+    the length of the formatted message.
+    """
+
+    _size = 0
+    _pending = 0
+    _regular_file = True
+
+    def _open(self):
+        stream = super()._open()
+        st = os.fstat(stream.fileno())
+        self._size = st.st_size
+        # See bpo-45401: never roll over anything other than regular files
+        self._regular_file = os.path.isfile(self.baseFilename)
+        return stream
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:  # delay was set
+            self.stream = self._open()
+        if self.maxBytes <= 0 or not self._regular_file:
+            return False
+        self._pending = len(self.format(record)) + 1
+        return self._size + self._pending >= self.maxBytes
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        self._size += self._pending
+        self._pending = 0
+
+
+class HealthCheckAccessFilter(logging.Filter):
+    """Drop uvicorn access-log records for health-check requests."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # uvicorn.access args: (client_addr, method, full_path, http_version, status_code)
+        args = record.args
+        if isinstance(args, tuple) and len(args) >= 3:
+            return args[2] not in HEALTH_CHECK_PATHS
+        return True
+
+
+def _stop_listener() -> None:
+    """Flush queued records and stop the background listener."""
+    global _listener, _configured
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _configured = None
+
+
+# Drain buffered records on interpreter shutdown
+atexit.register(_stop_listener)
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: str = "logs/agno_agent_api.log",
     log_format: str = "text",
+    per_process: bool = False,
 ) -> None:
-    """Configure application-wide logging with console and rotating file handlers."""
+    """Configure application-wide logging with console and rotating file handlers.
+
+    The root logger only gets a non-blocking ``QueueHandler``; the console
+    and file handlers run on a background ``QueueListener`` thread so that
+    log calls never block the event loop on disk or terminal I/O.
+
+    Repeat calls with the same arguments are no-ops, so every entry point
+    can call this without tearing down and re-attaching handlers.
+
+    Rotation is not safe across processes: with ``per_process`` each
+    process writes its own file, named with its PID (``api.1234.log``).
+    """
+    global _listener, _configured
+    config = (log_level, log_file, log_format, per_process)
+    if _configured == config and _listener is not None:
+        return
+
     log_path = Path(log_file)
+    if per_process:
+        log_path = log_path.with_name(f"{log_path.stem}.{os.getpid()}{log_path.suffix}")
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
     level = getattr(logging, log_level.upper(), logging.INFO)
@@ -51,31 +236,44 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
     root_logger.handlers.clear()
+    _stop_listener()
 
     if log_format == "json":
         formatter = JsonLogFormatter()
     else:
-        formatter = logging.Formatter(TEXT_LOG_FORMAT)
+        formatter = CachedTimeFormatter(TEXT_LOG_FORMAT)
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
 
-    # Rotating file handler
-    file_handler = RotatingFileHandler(
+    # Rotating file handler, buffered so records reach disk in batches
+    rotating_handler = SizeTrackingRotatingFileHandler(
         filename=str(log_path),
         maxBytes=DEFAULT_MAX_BYTES,
         backupCount=DEFAULT_BACKUP_COUNT,
         encoding="utf-8",
+        delay=True,
     )
+    rotating_handler.setFormatter(formatter)
+    file_handler = BufferedFileHandler(target=rotating_handler)
     file_handler.setLevel(level)
-    file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+
+    # Hand records off to a background thread that owns the real handlers
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger.addHandler(_RecordQueueHandler(log_queue))
+    _listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    _configured = config
 
     # Suppress noisy third-party loggers
-    for name in ("httpx", "httpcore", "urllib3", "hpack", "hpack.hpack", "hpack.table"):
+    for name in (
+        "httpx", "httpcore", "urllib3", "hpack", "hpack.hpack", "hpack.table",
+        "openai", "groq", "websockets", "asyncio",
+    ):
         logging.getLogger(name).setLevel(logging.WARNING)
     # Silero VAD "inference is slower than realtime" is noisy on dev machines
     logging.getLogger("livekit.plugins.silero").setLevel(logging.ERROR)
@@ -83,6 +281,10 @@ def setup_logging(
     logging.getLogger("livekit").setLevel(logging.WARNING)
     # Preserve livekit.agents logs at the configured level
     logging.getLogger("livekit.agents").setLevel(level)
+    # Probes hit /health every few seconds; keep the rest of the access log
+    access_logger = logging.getLogger("uvicorn.access")
+    if not any(isinstance(f, HealthCheckAccessFilter) for f in access_logger.filters):
+        access_logger.addFilter(HealthCheckAccessFilter())
 
     logging.getLogger(__name__).info(
         "Logging configured: level=%s, file=%s, format=%s",
@@ -96,19 +298,46 @@ def logger_hook(
     function_name: str, function_call: Callable, arguments: Dict[str, Any]
 ) -> Any:
     """Agno tool hook that logs function call duration and details."""
-    hook_logger = logging.getLogger("app.tools")
-    start_time = time.time()
-
+    start_ns = time.perf_counter_ns()
     result = function_call(**arguments)
+    _log_tool_call(function_name, arguments, result, start_ns)
+    return result
 
-    duration = time.time() - start_time
-    hook_logger.info(
-        "Tool %s executed in %.2fs | args=%s",
-        function_name,
-        duration,
-        str(arguments)[:500],
-        extra={"tool_name": function_name, "duration_s": round(duration, 3)},
-    )
-    hook_logger.debug("Tool %s returned: %s", function_name, str(result)[:1000])
 
+async def async_logger_hook(
+    function_name: str, function_call: Callable, arguments: Dict[str, Any]
+) -> Any:
+    """logger_hook for agents run with ``arun()``.
+
+    In async runs Agno passes an async ``function_call``; awaiting it here
+    times the tool itself rather than the creation of its coroutine. Agno
+    skips async hooks in sync runs, so register this on async agents only.
+    """
+    start_ns = time.perf_counter_ns()
+    result = function_call(**arguments)
+    if inspect.isawaitable(result):
+        result = await result
+    _log_tool_call(function_name, arguments, result, start_ns)
     return result
+
+
+def _log_tool_call(
+    function_name: str, arguments: Dict[str, Any], result: Any, start_ns: int
+) -> None:
+    hook_logger = _TOOLS_LOGGER
+    duration = (time.perf_counter_ns() - start_ns) / 1e9
+    if hook_logger.isEnabledFor(logging.INFO):
+        args_preview = _ARGS_REPR.repr(arguments)
+        hook_logger.info(
+            "Tool %s executed in %.2fs | args=%s",
+            function_name,
+            duration,
+            args_preview,
+            extra={
+                "tool_name": function_name,
+                "duration_s": round(duration, 3),
+                "args_preview": args_preview,
+            },
+        )
+    if hook_logger.isEnabledFor(logging.DEBUG):
+        hook_logger.debug("Tool %s returned: %s", function_name, str(result)[:1000])
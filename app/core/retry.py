@@ -2,24 +2,44 @@
 
 import asyncio
 import logging
+import random
+
+import httpx
 
 logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
-RETRY_BACKOFF = [1, 2, 4]  # seconds between retries
+RETRY_BACKOFF = [0.2, 0.4, 0.8]  # base seconds between retries, doubled at most by jitter
+RETRY_MAX_DELAY = 2.0
+
+# Failures of the connection itself; SDK errors (OpenAI, Groq) chain these as __cause__
+TRANSIENT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
 
 
-def _is_retryable(exc: Exception) -> bool:
-    """Return False for client errors that will never succeed on retry.
+def _is_retryable(exc: BaseException) -> bool:
+    """Return True only for failures a quick retry can fix.
 
-    Checks for a ``status_code`` attribute (used by the OpenAI SDK,
-    httpx, and most HTTP client libraries).  4xx errors are not retried
-    except for 429 (rate-limit), which is transient.
+    That is a transport error or timeout anywhere in the ``__cause__``
+    chain (Agno and the provider SDKs wrap the httpx error), or a
+    ``status_code`` of 429 or 5xx on the innermost exception (used by the
+    OpenAI SDK, httpx, and most HTTP client libraries). Anything else -
+    bad requests, auth errors, bugs - is raised on the first attempt.
     """
-    status = getattr(exc, "status_code", None)
-    if status is not None and 400 <= status < 500 and status != 429:
-        return False
-    return True
+    root = exc
+    while True:
+        if isinstance(root, TRANSIENT_ERRORS):
+            return True
+        if root.__cause__ is None:
+            break
+        root = root.__cause__
+    status = getattr(root, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def retry_delay(attempt: int, backoff=RETRY_BACKOFF, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """Seconds to wait after failed *attempt* (0-based): jittered, capped at *max_delay*."""
+    base = backoff[attempt] if attempt < len(backoff) else backoff[-1]
+    return min(base + random.uniform(0, base), max_delay)
 
 
 async def with_retry(
@@ -29,13 +49,13 @@ async def with_retry(
     backoff=RETRY_BACKOFF,
     **kwargs,
 ):
-    """Call an async function with retry logic for transient failures.
+    """Call an async function, retrying transient failures.
 
     Args:
         coro_func: An async callable to invoke.
         *args: Positional arguments forwarded to *coro_func*.
         max_retries: Total number of attempts (default 3).
-        backoff: List of sleep durations between retries.
+        backoff: Base sleep durations between retries, before jitter.
         **kwargs: Keyword arguments forwarded to *coro_func*.
 
     Returns:
@@ -43,30 +63,21 @@ async def with_retry(
 
     Raises:
         The exception from the final failed attempt, or immediately
-        for non-retryable errors (4xx except 429).
+        for anything ``_is_retryable`` rejects.
     """
-    last_exception = None
     for attempt in range(max_retries):
         try:
             return await coro_func(*args, **kwargs)
         except Exception as e:
-            last_exception = e
-            if not _is_retryable(e):
-                logger.warning(
-                    "Non-retryable error (%s: %s), not retrying",
-                    type(e).__name__,
-                    str(e)[:200],
-                )
+            if not _is_retryable(e) or attempt >= max_retries - 1:
                 raise
-            if attempt < max_retries - 1:
-                wait = backoff[attempt] if attempt < len(backoff) else backoff[-1]
-                logger.warning(
-                    "Attempt %d/%d failed (%s: %s), retrying in %ds",
-                    attempt + 1,
-                    max_retries,
-                    type(e).__name__,
-                    str(e)[:200],
-                    wait,
-                )
-                await asyncio.sleep(wait)
-    raise last_exception
+            wait = retry_delay(attempt, backoff)
+            logger.warning(
+                "Attempt %d/%d failed (%s: %s), retrying in %.1fs",
+                attempt + 1,
+                max_retries,
+                type(e).__name__,
+                str(e)[:200],
+                wait,
+            )
+            await asyncio.sleep(wait)
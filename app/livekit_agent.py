@@ -19,18 +19,17 @@ Environment Variables Required:
 """
 
 import asyncio
+import json
 import logging
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
-# Add parent directory to path so absolute imports work
-sys.path.insert(0, str(Path(__file__).parent.parent))
+if __name__ == "__main__":
+    # Running as a script: add the repo root so absolute `app.*` imports resolve.
+    # Library importers (tests, tooling) keep their sys.path untouched.
+    sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from agno.agent import Agent as AgnoAgent
-from agno.db.sqlite import SqliteDb
-from agno.models.openrouter import OpenRouter
-from app.tools.search import create_search_tools
-from app.tools.sql_tool import create_sql_tools as _create_sql_tools, fetch_equipment_summary
 from dotenv import load_dotenv
 from livekit import api, rtc
 from livekit.agents import (
@@ -43,16 +42,18 @@ from livekit.agents import (
     inference,
     room_io,
 )
+# LiveKit plugins stay at module level: they must register on the main
+# thread at import time, and `download-files` discovers them that way.
 from livekit.plugins import noise_cancellation, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-from app.services.livekit_agno_plugin import LLMAdapter
 from app.config.settings import settings
 from app.core.logging import setup_logging
-from app.tools.s3_search import S3SearchTool
-from app.tools.send_document import SendDocumentTool
 from app.voice_health import health, start_health_server
 
+if TYPE_CHECKING:
+    from agno.agent import Agent as AgnoAgent
+
 # Load environment variables
 load_dotenv()
 
@@ -65,7 +66,11 @@ logger = logging.getLogger(__name__)
 # Voice-optimized System Prompt
 # =============================================================================
 
-VOICE_SYSTEM_PROMPT = """
+# Stripped once at import so every session sends a byte-identical prefix;
+# Agno emits instructions first in the system message, which lets the
+# provider's automatic prompt caching reuse it across rooms. Per-room
+# CURRENT CONTEXT is only ever appended after it.
+VOICE_SYSTEM_PROMPT: Final[str] = """
 You are Alex, a voice assistant for work orders and equipment repair.
 
 RULES:
@@ -88,7 +93,7 @@ Never share S3 presigned URLs. S3 is an internal cache only.
 When equipment details are pre-loaded in CURRENT CONTEXT, use them directly for part lookups, troubleshooting, and specifications — do not re-query the database for basic equipment info.
 
 Keep it short and natural like a phone call.
-"""
+""".strip()
 
 
 # =============================================================================
@@ -116,49 +121,115 @@ OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY
 # Lazy session DB — avoid opening SQLite in every idle child process
 _turso_db = None
 
+# Agno persists small session rows every turn. WAL turns those into
+# sequential appends, and synchronous=NORMAL drops the per-commit fsync
+# (still crash-safe in WAL mode).
+_SESSION_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in _SESSION_DB_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 
 def _get_turso_db():
     global _turso_db
     if _turso_db is None:
+        from agno.db.sqlite import SqliteDb
+        from sqlalchemy import event
+
         _turso_db = SqliteDb(db_file="tmp/livekit_sessions.db")
+        event.listen(_turso_db.db_engine, "connect", _set_sqlite_pragmas)
     return _turso_db
 
 
-def create_sql_tools():
-    """Create a fresh read-only SQLTools instance to avoid connection expiration."""
-    return _create_sql_tools(db_engine=_get_engine())
+# Shared read-only SQL toolkit. The engine pool — not the toolkit — is the
+# unit of isolation: pool_pre_ping replaces stale Turso connections, so one
+# SQLTools instance can serve every room in this process.
+_sql_tools = None
 
 
-def create_agno_agent() -> AgnoAgent:
-    """Create and configure the Agno agent with tools for voice interaction."""
+def _get_sql_tools():
+    """Return the process-wide read-only SQLTools instance, creating it lazily."""
+    global _sql_tools
+    if _sql_tools is None:
+        from app.tools.sql_tool import create_sql_tools
+
+        _sql_tools = create_sql_tools(db_engine=_get_engine())
+    return _sql_tools
+
+
+# Toolkits and the model client are stateless between runs (Agno copies each
+# tool function per run), so build them once per process and hand every
+# room's agent the same instances. Only the Agent itself is per room, since
+# voice_agent() writes room-specific context into its instructions.
+_shared_tools: list | None = None
+_voice_model = None
 
-    search_tools = create_search_tools()
-    sql_tools = create_sql_tools()
-    tools = [search_tools, sql_tools]
-
-    if settings.DOCUMENT_WEBHOOK_URL:
-        tools.append(SendDocumentTool(
-            webhook_url=settings.DOCUMENT_WEBHOOK_URL,
-            webhook_secret=settings.DOCUMENT_WEBHOOK_SECRET,
-        ))
-    if settings.S3_BUCKET_NAME:
-        tools.append(S3SearchTool(
-            bucket_name=settings.S3_BUCKET_NAME,
-            region=settings.S3_REGION,
-            access_key_id=settings.S3_ACCESS_KEY_ID,
-            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
-            presigned_url_expiry=settings.S3_PRESIGNED_URL_EXPIRY,
-        ))
+
+def _get_shared_tools() -> list:
+    """Return the process-wide voice toolkits, creating them lazily."""
+    global _shared_tools
+    if _shared_tools is None:
+        from app.tools.s3_search import S3SearchTool
+        from app.tools.search import get_search_tools
+        from app.tools.send_document import SendDocumentTool
+
+        tools = [get_search_tools(), _get_sql_tools()]
+        if settings.DOCUMENT_WEBHOOK_URL:
+            tools.append(SendDocumentTool(
+                webhook_url=settings.DOCUMENT_WEBHOOK_URL,
+                webhook_secret=settings.DOCUMENT_WEBHOOK_SECRET,
+            ))
+        if settings.S3_BUCKET_NAME:
+            tools.append(S3SearchTool(
+                bucket_name=settings.S3_BUCKET_NAME,
+                region=settings.S3_REGION,
+                access_key_id=settings.S3_ACCESS_KEY_ID,
+                secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                presigned_url_expiry=settings.S3_PRESIGNED_URL_EXPIRY,
+            ))
+        _shared_tools = tools
+    return _shared_tools
+
+
+def _get_voice_model():
+    """Return the process-wide OpenRouter model, reusing its HTTP client."""
+    global _voice_model
+    if _voice_model is None:
+        from agno.models.openrouter import OpenRouter
+
+        _voice_model = OpenRouter(id="openai/gpt-oss-120b", api_key=OPENROUTER_API_KEY)
+    return _voice_model
+
+
+def create_agno_agent() -> "AgnoAgent":
+    """Create and configure the Agno agent with tools for voice interaction."""
+    from agno.agent import Agent as AgnoAgent
 
     agent = AgnoAgent(
-        model=OpenRouter(id="openai/gpt-oss-120b", api_key=OPENROUTER_API_KEY),
-        tools=tools,
+        model=_get_voice_model(),
+        tools=list(_get_shared_tools()),
         instructions=VOICE_SYSTEM_PROMPT,
         markdown=False,
         add_datetime_to_context=True,
         db=_get_turso_db(),
         add_history_to_context=True,
         num_history_runs=3,
+        # Replay the spoken turns only; past web-search/SQL payloads are
+        # thousands of tokens each and would dominate every prefill
+        max_tool_calls_from_history=0,
+        telemetry=False,  # no Agno API call between the user's turn and the reply
     )
 
     return agent
@@ -168,17 +239,33 @@ def create_agno_agent() -> AgnoAgent:
 # LiveKit Agent Setup
 # =============================================================================
 
+# Each job process loads its own VAD in prewarm (an ONNX runtime session
+# can't be shared across processes). Keeping idle processes around is how
+# that load is amortized: rooms land on a process that is already warm.
+# Never keep more warm processes than the CPUs we are allowed to use.
 server = AgentServer(
     initialize_process_timeout=90.0,
-    num_idle_processes=0,
+    num_idle_processes=min(settings.VOICE_IDLE_PROCESSES, settings.worker_count),
 )
 
 
 def prewarm(proc: JobProcess):
-    """Prewarm function - loads VAD model ahead of time."""
+    """Prewarm function - loads VAD model and the Agno stack ahead of time."""
     proc.userdata["vad"] = silero.VAD.load(min_silence_duration=0.8)
     logger.info("VAD model prewarmed successfully")
 
+    # Noise-cancellation options are immutable descriptors of the model to
+    # apply; build them once instead of on every participant join.
+    proc.userdata["bvc"] = noise_cancellation.BVC()
+    proc.userdata["bvc_telephony"] = noise_cancellation.BVCTelephony()
+
+    # The Agno/OpenAI stack is only imported lazily so the supervisor process
+    # and CLI stay light; pull it in here so the first room doesn't pay for it.
+    import app.services.livekit_agno_plugin  # noqa: F401
+
+    _get_shared_tools()
+    _get_voice_model()
+
 
 server.setup_fnc = prewarm
 
@@ -331,13 +418,11 @@ def _extract_page_context(ctx: JobContext) -> dict | None:
     The frontend sets metadata as a JSON string on the token, e.g.:
         {"listing_id": "123", "equipment_name": "John Deere 333G", "page": "details"}
     """
-    import json as _json
-
     # Check room metadata first
     room_meta = getattr(ctx.room, "metadata", None)
     if room_meta:
         try:
-            return _json.loads(room_meta)
+            return json.loads(room_meta)
         except (ValueError, TypeError):
             pass
 
@@ -346,7 +431,7 @@ def _extract_page_context(ctx: JobContext) -> dict | None:
         logger.debug("Participant %s metadata: %s", p.identity, p.metadata)
         if p.metadata:
             try:
-                parsed = _json.loads(p.metadata)
+                parsed = json.loads(p.metadata)
                 logger.info("Extracted page context from participant %s: %s", p.identity, parsed)
                 return parsed
             except (ValueError, TypeError):
@@ -365,6 +450,9 @@ async def voice_agent(ctx: JobContext):
         "room": ctx.room.name,
     }
 
+    from app.services.livekit_agno_plugin import LLMAdapter
+    from app.tools.sql_tool import fetch_equipment_summary
+
     logger.info("Voice agent starting for room: %s", ctx.room.name)
     health.session_started()
 
@@ -378,8 +466,7 @@ async def voice_agent(ctx: JobContext):
         # Callback to send clickable links to the frontend via data channel
         def send_link_to_room(url: str):
             """Publish a URL as a data message so the frontend can render it as a clickable link."""
-            import json as _json
-            payload = _json.dumps({"type": "link", "url": url}).encode("utf-8")
+            payload = json.dumps({"type": "link", "url": url}).encode("utf-8")
             asyncio.get_event_loop().create_task(
                 ctx.room.local_participant.publish_data(payload, topic="link")
             )
@@ -437,7 +524,7 @@ async def voice_agent(ctx: JobContext):
             # Pre-fetch equipment details from DB if listing_id is present
             listing_id = page_context.get("listing_id")
             if listing_id:
-                equip = fetch_equipment_summary(_get_engine(), listing_id)
+                equip = await asyncio.to_thread(fetch_equipment_summary, _get_engine(), listing_id)
                 if equip:
                     equip_parts = [
                         f"Make: {equip['make']}" if equip.get("make") else None,
@@ -470,9 +557,9 @@ async def voice_agent(ctx: JobContext):
             room_options=room_io.RoomOptions(
                 audio_input=room_io.AudioInputOptions(
                     noise_cancellation=lambda params: (
-                        noise_cancellation.BVCTelephony()
+                        ctx.proc.userdata["bvc_telephony"]
                         if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
-                        else noise_cancellation.BVC()
+                        else ctx.proc.userdata["bvc"]
                     ),
                 ),
             ),
@@ -1,17 +1,26 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 
 from app.config.settings import settings
 from app.core.logging import setup_logging
 
-# Configure logging before importing services (so their module-level code inherits config)
-setup_logging(log_level=settings.LOG_LEVEL, log_file=settings.LOG_FILE, log_format=settings.LOG_FORMAT)
+# Configure logging before importing services (so their module-level code inherits config).
+# Only an explicit WORKERS > 1 means several uvicorn workers share LOG_FILE (the
+# __main__ block below exports it); each of those processes rotates its own file.
+setup_logging(
+    log_level=settings.LOG_LEVEL,
+    log_file=settings.LOG_FILE,
+    log_format=settings.LOG_FORMAT,
+    per_process=settings.WORKERS > 1,
+)
 
 from app.core.formatting import md_to_html  # noqa: E402
 from app.services.agno_service import agno_service  # noqa: E402
@@ -21,12 +30,20 @@ from app.services.pm_schedule_service import pm_schedule_service  # noqa: E402
 logger = logging.getLogger(__name__)
 
 
+# Request size caps — oversized payloads are rejected with 422 during
+# validation, before they reach the LLM
+MAX_MESSAGE_CHARS = 8000
+MAX_ID_CHARS = 128
+MAX_METADATA_CHARS = 4000
+MAX_BATCH_MESSAGES = 20
+
+
 # Request/Response models
 class ChatRequest(BaseModel):
-    message: str
-    session_id: Optional[str] = None
-    user_id: str = "default"
-    metadata: Optional[str] = None  # JSON: {"listing_id", "work_order_id", "equipment_name", "page"}
+    message: str = Field(max_length=MAX_MESSAGE_CHARS)
+    session_id: Optional[str] = Field(default=None, max_length=MAX_ID_CHARS)
+    user_id: str = Field(default="default", max_length=MAX_ID_CHARS)
+    metadata: Optional[str] = Field(default=None, max_length=MAX_METADATA_CHARS)  # JSON: {"listing_id", "work_order_id", "equipment_name", "page"}
 
 
 class ChatResponse(BaseModel):
@@ -34,12 +51,35 @@ class ChatResponse(BaseModel):
     session_id: str
 
 
-class DiagnosticsRequest(BaseModel):
-    message: str
-    listing_id: str
+class ChatBatchRequest(BaseModel):
+    messages: list[str] = Field(min_length=1, max_length=MAX_BATCH_MESSAGES)
+    user_id: str = Field(default="default", max_length=MAX_ID_CHARS)
+    metadata: Optional[str] = Field(default=None, max_length=MAX_METADATA_CHARS)
+
+    @field_validator("messages")
+    @classmethod
+    def _cap_message_length(cls, messages: list[str]) -> list[str]:
+        if any(len(m) > MAX_MESSAGE_CHARS for m in messages):
+            raise ValueError(f"each message must be at most {MAX_MESSAGE_CHARS} characters")
+        return messages
+
+
+class ChatBatchResult(BaseModel):
+    response: Optional[str] = None
     session_id: Optional[str] = None
-    user_id: str = "default"
-    metadata: Optional[str] = None  # JSON: {"work_order_id", "equipment_name", "page"}
+    error: Optional[str] = None  # set instead of response when this message failed
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatBatchResult]
+
+
+class DiagnosticsRequest(BaseModel):
+    message: str = Field(max_length=MAX_MESSAGE_CHARS)
+    listing_id: str = Field(max_length=MAX_ID_CHARS)
+    session_id: Optional[str] = Field(default=None, max_length=MAX_ID_CHARS)
+    user_id: str = Field(default="default", max_length=MAX_ID_CHARS)
+    metadata: Optional[str] = Field(default=None, max_length=MAX_METADATA_CHARS)  # JSON: {"work_order_id", "equipment_name", "page"}
 
 
 class DiagnosticsResponse(BaseModel):
@@ -75,7 +115,13 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
     logger.info("Starting up Agno Agent API...")
+    # Tool calls, Turso queries and searches all run via asyncio.to_thread;
+    # size the pool to the DB pool instead of Python's min(32, CPUs + 4)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.io_thread_count, thread_name_prefix="io")
+    )
     await agno_service.initialize()
+    await agno_service.warmup()
     await diagnostics_service.initialize()
     await pm_schedule_service.initialize()
     logger.info("Agno Agent, Diagnostics, and PM Schedule services initialized successfully")
@@ -97,9 +143,23 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Paths polled by load balancers; browsers never call these cross-origin
+_CORS_EXEMPT_PATHS = frozenset({"/", "/health"})
+
+
+class APICORSMiddleware(CORSMiddleware):
+    """CORSMiddleware that lets health probes bypass CORS header handling."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in _CORS_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # Configure CORS
 app.add_middleware(
-    CORSMiddleware,
+    APICORSMiddleware,
     allow_origins=["*"],  # In production, specify actual origins
     allow_credentials=True,
     allow_methods=["*"],
@@ -107,20 +167,25 @@ app.add_middleware(
 )
 
 
+# Health bodies never change; serve pre-encoded bytes to load-balancer probes
+_ROOT_BODY = b'{"status":"healthy","service":"Agno Agent API"}'
+_HEALTH_BODY = b'{"status":"healthy"}'
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "Agno Agent API"}
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_no_cache: Optional[str] = Header(default=None)):
     """
     Chat with the AI agent.
 
@@ -128,6 +193,8 @@ async def chat(request: ChatRequest):
     - Web search (Tavily) for current information
     - MySQL database for data queries and operations
     - Conversation history stored in MySQL
+
+    Send an ``X-No-Cache`` header to bypass the response cache.
     """
     try:
         result = await agno_service.chat(
@@ -135,18 +202,47 @@ async def chat(request: ChatRequest):
             session_id=request.session_id,
             user_id=request.user_id,
             metadata=request.metadata,
+            use_cache=x_no_cache is None,
         )
         return ChatResponse(
             response=md_to_html(result["response"]),
             session_id=result["session_id"],
         )
     except Exception as e:
-        logger.error(f"Chat error: {str(e)}")
+        logger.error("Chat error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/chat/batch", response_model=ChatBatchResponse, response_model_exclude_none=True)
+async def chat_batch(request: ChatBatchRequest, x_no_cache: Optional[str] = Header(default=None)):
+    """
+    Ask several independent questions at once.
+
+    Each message runs in its own new session; up to 8 agent runs are in
+    flight concurrently. Results are returned in input order; a message
+    whose run failed gets an ``error`` instead of a response.
+    """
+    try:
+        results = await agno_service.chat_batch(
+            messages=request.messages,
+            user_id=request.user_id,
+            metadata=request.metadata,
+            use_cache=x_no_cache is None,
+        )
+        return ChatBatchResponse(
+            results=[
+                ChatBatchResult(error=r["error"]) if "error" in r
+                else ChatBatchResult(response=md_to_html(r["response"]), session_id=r["session_id"])
+                for r in results
+            ]
+        )
+    except Exception as e:
+        logger.error("Chat batch error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, x_no_cache: Optional[str] = Header(default=None)):
     """
     Stream chat responses from the AI agent.
 
@@ -156,6 +252,7 @@ async def chat_stream(request: ChatRequest):
     - Conversation history stored in MySQL
 
     Returns a streaming response with Server-Sent Events (SSE) format.
+    Send an ``X-No-Cache`` header to bypass the response cache.
     """
     try:
         return StreamingResponse(
@@ -164,6 +261,7 @@ async def chat_stream(request: ChatRequest):
                 session_id=request.session_id,
                 user_id=request.user_id,
                 metadata=request.metadata,
+                use_cache=x_no_cache is None,
             ),
             media_type="text/event-stream",
             headers={
@@ -173,7 +271,7 @@ async def chat_stream(request: ChatRequest):
             },
         )
     except Exception as e:
-        logger.error(f"Chat stream error: {str(e)}")
+        logger.error("Chat stream error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -205,7 +303,7 @@ async def diagnostics(request: DiagnosticsRequest):
             execution_time=result["execution_time"],
         )
     except Exception as e:
-        logger.error(f"Diagnostics error: {str(e)}")
+        logger.error("Diagnostics error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -224,7 +322,7 @@ async def pm_schedule(request: PMScheduleRequest):
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"PM schedule extraction error: {str(e)}")
+        logger.error("PM schedule extraction error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -251,7 +349,29 @@ async def livekit_token(request: TokenRequest):
 
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8090)
+    # One worker per available CPU (Settings.WORKERS overrides). Each worker
+    # builds its own services in lifespan; chat history lives in the session
+    # DB, so any worker can continue any session. workers > 1 needs the
+    # import-string form of the app. uvloop/httptools keep socket I/O and HTTP
+    # parsing in C for SSE streaming; no endpoint uses websockets.
+    # Keep-alive outlasts typical client reuse gaps; limit_concurrency makes
+    # an overloaded worker answer 503 instead of queueing unbounded tasks.
+    workers = settings.worker_count
+    # Spawned workers re-import app.main and read WORKERS from the environment
+    os.environ["WORKERS"] = str(workers)
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8090,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        ws="none",
+        timeout_keep_alive=30,
+        limit_concurrency=1024,
+    )
 
@@ -9,7 +9,7 @@ offending IDs before the request is sent.
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List
+from typing import Any
 
 from agno.models.openai import OpenAIChat
 
@@ -0,0 +1,10 @@
+"""Agent system prompts, kept as plain-text files next to this module."""
+
+from pathlib import Path
+
+_PROMPT_DIR = Path(__file__).parent
+
+
+def load_prompt(name: str) -> str:
+    """Return the text of ``<name>.txt`` from this package."""
+    return (_PROMPT_DIR / f"{name}.txt").read_text(encoding="utf-8").strip()
@@ -1,4 +1,22 @@
-from app.services.agno_service import agno_service
-from app.services.livekit_agno_plugin import LLMAdapter, AgnoStream
+# App package
+#
+# Re-exports are resolved lazily so that importing one service module
+# (e.g. the LiveKit plugin from the voice worker) doesn't also build the
+# chat service and its module-level DB handles.
 
 __all__ = ["agno_service", "LLMAdapter", "AgnoStream"]
+
+
+def __getattr__(name):
+    if name == "agno_service":
+        from app.services.agno_service import agno_service as value
+    elif name in ("LLMAdapter", "AgnoStream"):
+        from app.services import livekit_agno_plugin
+
+        value = getattr(livekit_agno_plugin, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache on the package; this also replaces the submodule binding that
+    # importing app.services.agno_service leaves under the same name.
+    globals()[name] = value
+    return value
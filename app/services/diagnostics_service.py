@@ -1,21 +1,22 @@
+import asyncio
+import json
 import logging
+import re
+import secrets
 import time
-import uuid
-from typing import List, Optional
+from typing import Final, Optional
 
 from agno.agent import Agent
-from agno.db.sqlite import SqliteDb
-from agno.models.groq import Groq
-from app.models.openai_patch import PatchedOpenAIChat
 from agno.models.openrouter import OpenRouter
 from agno.run.agent import RunOutput
-from app.tools.search import create_search_tools
+from agno.run.base import RunStatus
+from app.tools.search import get_search_tools
 from app.tools.sql_tool import create_sql_tools
-from pydantic import BaseModel, Field
 
 from app.config.settings import settings
-from app.core.logging import logger_hook
+from app.core.logging import async_logger_hook
 from app.core.retry import with_retry
+from app.prompts import load_prompt
 from app.tools.s3_search import S3SearchTool
 from app.tools.send_document import SendDocumentTool
 
@@ -24,7 +25,6 @@ logger = logging.getLogger(__name__)
 
 def _parse_diagnostics(text: str) -> list[str]:
     """Split diagnostics paragraphs into a list of strings."""
-    import re
     # Split on blank lines or numbered prefixes
     parts = re.split(r"\n\s*\n|\n\s*\d+\.\s+", "\n" + text.strip())
     results = []
@@ -40,16 +40,8 @@ def _parse_diagnostics(text: str) -> list[str]:
 ENGINE = settings.db_engine
 GROQ_API_KEY = settings.GROQ_API_KEY
 
-# System prompt for the diagnostics agent
-DIAGNOSTICS_SYSTEM_PROMPT = """
-You are Alex, an AI diagnostic specialist. Query the database for the listing ID provided. Provide exactly 2 diagnostics: the most likely cause first, then one alternative. Do not use web search. No emojis.
-
-Each diagnostic must start with the likelihood ("Most likely" or "Also possible"), then the diagnosis, cause, how to check, and fix. Keep each diagnostic to 3-4 sentences maximum. Be concise. Separate each diagnostic with a blank line.
-
-DATABASE HINTS: The equipment table is called "listing" (not "listings"). The listing ID column is "id". Always use list_tables and describe_table before querying to confirm table and column names.
-
-Never reveal database internals to users. Never mention table names, column names, schema, or SQL queries in your response. If asked about the database structure, just say "I'm not able to help with that."
-"""
+# Diagnostics prompt lives in app/prompts/diagnostics.txt; read once per process
+DIAGNOSTICS_SYSTEM_PROMPT: Final[str] = load_prompt("diagnostics")
 
 
 class DiagnosticsService:
@@ -58,12 +50,14 @@ class DiagnosticsService:
     def __init__(self):
         self.agent: Optional[Agent] = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         self.search_tools = None
+        self.sql_tools = None
         self._extra_tools: list = []
 
     def _create_sql_tools(self):
-        """Create a fresh read-only SQLTools instance to avoid connection expiration"""
-        logger.debug("Creating fresh SQLTools instance for diagnostics")
+        """Create the read-only SQLTools instance shared by every run."""
+        logger.debug("Creating SQLTools instance for diagnostics")
         return create_sql_tools(db_engine=ENGINE)
 
     async def initialize(self):
@@ -71,42 +65,51 @@ class DiagnosticsService:
         if self._initialized:
             return
 
-        try:
-            # Initialize search tools
-            self.search_tools = create_search_tools()
+        # Double-checked under the lock so concurrent first requests
+        # (or lifespan racing a request) build the agent only once
+        async with self._init_lock:
+            if self._initialized:
+                return
+
+            try:
+                # Process-wide search toolkit, shared with the chat agent
+                self.search_tools = get_search_tools()
             
-            # Create fresh SQL tools instance
-            sql_tools = self._create_sql_tools()
-
-            # Build tools list
-            if settings.DOCUMENT_WEBHOOK_URL:
-                self._extra_tools.append(SendDocumentTool(webhook_url=settings.DOCUMENT_WEBHOOK_URL, webhook_secret=settings.DOCUMENT_WEBHOOK_SECRET))
-            if settings.S3_BUCKET_NAME:
-                self._extra_tools.append(S3SearchTool(
-                    bucket_name=settings.S3_BUCKET_NAME,
-                    region=settings.S3_REGION,
-                    access_key_id=settings.S3_ACCESS_KEY_ID,
-                    secret_access_key=settings.S3_SECRET_ACCESS_KEY,
-                    presigned_url_expiry=settings.S3_PRESIGNED_URL_EXPIRY,
-                ))
-            tools = [self.search_tools, sql_tools] + self._extra_tools
-
-            # Create the agent — Gemini 2.5 Flash via OpenRouter for speed
-            self.agent = Agent(
-                model=OpenRouter(id="google/gemini-2.5-flash", api_key=settings.OPENROUTER_API_KEY),
-                markdown=False,
-                tools=tools,
-                system_message=DIAGNOSTICS_SYSTEM_PROMPT,
-                add_history_to_context=False,
-                tool_hooks=[logger_hook],
-            )
+                # Shared for the agent's lifetime; the engine handles stale connections
+                self.sql_tools = self._create_sql_tools()
+
+                # Build tools list (from scratch, so re-init after cleanup doesn't duplicate)
+                self._extra_tools = []
+                if settings.DOCUMENT_WEBHOOK_URL:
+                    self._extra_tools.append(SendDocumentTool(webhook_url=settings.DOCUMENT_WEBHOOK_URL, webhook_secret=settings.DOCUMENT_WEBHOOK_SECRET))
+                if settings.S3_BUCKET_NAME:
+                    self._extra_tools.append(S3SearchTool(
+                        bucket_name=settings.S3_BUCKET_NAME,
+                        region=settings.S3_REGION,
+                        access_key_id=settings.S3_ACCESS_KEY_ID,
+                        secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                        presigned_url_expiry=settings.S3_PRESIGNED_URL_EXPIRY,
+                    ))
+                tools = [self.search_tools, self.sql_tools] + self._extra_tools
+
+                # Create the agent — Gemini 2.5 Flash via OpenRouter for speed
+                self.agent = Agent(
+                    model=OpenRouter(id="google/gemini-2.5-flash", api_key=settings.OPENROUTER_API_KEY),
+                    markdown=False,
+                    tools=tools,
+                    system_message=DIAGNOSTICS_SYSTEM_PROMPT,
+                    resolve_in_context=False,  # static prompt, sent verbatim
+                    add_history_to_context=False,
+                    tool_hooks=[async_logger_hook],  # agent is only run with arun()
+                    telemetry=False,  # no Agno API call on the response path
+                )
             
-            self._initialized = True
-            logger.info("Diagnostics agent initialized successfully with structured output")
+                self._initialized = True
+                logger.info("Diagnostics agent initialized successfully with structured output")
             
-        except Exception as e:
-            logger.error(f"Failed to initialize diagnostics agent: {str(e)}")
-            raise
+            except Exception as e:
+                logger.error("Failed to initialize diagnostics agent: %s", e)
+                raise
 
     async def ensure_initialized(self):
         """Ensure the agent is initialized before use"""
@@ -116,6 +119,10 @@ class DiagnosticsService:
     async def cleanup(self):
         """Cleanup resources"""
         self._initialized = False
+        # Release pooled HTTP connections held by tools (SendDocumentTool)
+        for tool in self._extra_tools:
+            if hasattr(tool, "aclose"):
+                await tool.aclose()
         logger.info("Diagnostics service cleaned up")
 
     async def diagnose(
@@ -141,19 +148,13 @@ class DiagnosticsService:
         """
         await self.ensure_initialized()
 
-        # Create fresh SQL tools for this request
-        logger.debug("Creating fresh SQL tools for diagnostics request")
-        fresh_sql_tools = self._create_sql_tools()
-        self.agent.tools = [self.search_tools, fresh_sql_tools] + self._extra_tools
-
         # Generate session ID if not provided
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = secrets.token_hex(16)
 
         # Construct the diagnostic request message with optional context
         context = ""
         if metadata:
-            import json
             try:
                 ctx = json.loads(metadata)
                 if ctx.get("work_order_id"):
@@ -165,7 +166,7 @@ class DiagnosticsService:
         diagnostic_message = f"Listing ID: {listing_id}.{context} Issue: {message}"
 
         try:
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             
             # Run the agent with structured output and retry for transient failures
             response: RunOutput = await with_retry(
@@ -175,15 +176,20 @@ class DiagnosticsService:
                 user_id=user_id,
             )
             
-            execution_time = time.time() - start_time
+            execution_time = (time.perf_counter_ns() - start_ns) / 1e9
+
+            # A failed run comes back as content, not an exception; don't
+            # answer 200 with an empty list
+            if response.status == RunStatus.error:
+                raise RuntimeError(f"Agent run failed: {response.content}")
 
             # Parse numbered list from plain text response
-            raw = str(response.content) if response.content else ""
+            raw = str(response.content or "")
             diagnostics_list = _parse_diagnostics(raw)
 
             logger.info(
-                f"Diagnostics generated for listing {listing_id}, session {session_id} "
-                f"in {round(execution_time, 3)}s"
+                "Diagnostics generated for listing %s, session %s in %.3fs",
+                listing_id, session_id, execution_time,
             )
 
             return {
@@ -194,7 +200,7 @@ class DiagnosticsService:
             }
 
         except Exception as e:
-            logger.error(f"Diagnostics error: {str(e)}")
+            logger.error("Diagnostics error: %s", e)
             raise
 
 
@@ -6,7 +6,6 @@
 from __future__ import annotations
 
 import asyncio
-import json as _json
 import logging
 import re
 from collections.abc import Callable
@@ -17,7 +16,7 @@ logger = logging.getLogger(__name__)
 from agno.agent import Agent
 from agno.run.agent import RunContentEvent, RunOutput
 
-from app.core.retry import MAX_RETRIES, RETRY_BACKOFF, _is_retryable
+from app.core.retry import MAX_RETRIES, _is_retryable, retry_delay
 
 from livekit.agents.llm.chat_context import ChatContext, ChatMessage
 from livekit.agents import llm
@@ -128,8 +127,14 @@ class AgnoStream(llm.LLMStream):
                 # Sentence buffer: accumulate chunks and release on sentence
                 # boundaries so _sanitize_for_tts can match multi-token
                 # patterns (reasoning sentences, role tokens, tool routing).
+                # Long sentences are released early at clause breaks so TTS
+                # can start speaking, but only while the keyword filter passes
+                # on the whole sentence so far (flushed clauses plus buffer);
+                # once it fails, the rest of that sentence is dropped.
                 buffer = ""
+                clauses = ""
                 sent_urls: set[str] = set()
+                dropping = False
 
                 async for event in response_stream:
                     raw = _extract_content(event)
@@ -142,52 +147,33 @@ class AgnoStream(llm.LLMStream):
                     # act as sentence boundaries (newline = boundary)
                     buffer = _PREFIX_BOUNDARY_RE.sub("\n", buffer)
 
-                    # Flush complete sentences from the buffer
+                    # Flush complete sentences (or long clauses) from the buffer
                     while True:
                         idx = _sentence_boundary(buffer)
-                        if idx == -1:
-                            break
-                        sentence = buffer[:idx]
+                        soft = idx == -1
+                        if soft:
+                            idx = _soft_boundary(buffer)
+                            if idx == -1:
+                                break
+                            if _REASONING_KEYWORDS.search(clauses + buffer):
+                                dropping = True
+                        piece = buffer[:idx]
                         buffer = buffer[idx:]
+                        clauses = clauses + piece if soft else ""
 
-                        # Extract and send URLs before TTS strips them
-                        if self._send_link:
-                            for url in _extract_urls(sentence):
-                                if url not in sent_urls:
-                                    sent_urls.add(url)
-                                    self._send_link(url)
+                        if dropping:
+                            dropping = soft
+                            continue
 
-                        cleaned = _sanitize_for_tts(sentence)
-                        if cleaned and cleaned.strip():
+                        if self._emit(piece, sent_urls):
                             content_sent = True
-                            self._event_ch.send_nowait(
-                                llm.ChatChunk(
-                                    id="agno",
-                                    delta=llm.ChoiceDelta(
-                                        role="assistant", content=cleaned
-                                    ),
-                                )
-                            )
+                        elif soft:
+                            dropping = True
 
                 # Flush remaining buffer
-                if buffer.strip():
-                    if self._send_link:
-                        for url in _extract_urls(buffer):
-                            if url not in sent_urls:
-                                sent_urls.add(url)
-                                self._send_link(url)
-
-                    cleaned = _sanitize_for_tts(buffer)
-                    if cleaned and cleaned.strip():
+                if buffer.strip() and not dropping:
+                    if self._emit(buffer, sent_urls):
                         content_sent = True
-                        self._event_ch.send_nowait(
-                            llm.ChatChunk(
-                                id="agno",
-                                delta=llm.ChoiceDelta(
-                                    role="assistant", content=cleaned
-                                ),
-                            )
-                        )
 
                 # Stream completed successfully
                 return
@@ -195,13 +181,36 @@ class AgnoStream(llm.LLMStream):
             except Exception as e:
                 if content_sent or not _is_retryable(e) or attempt >= MAX_RETRIES - 1:
                     raise
-                wait = RETRY_BACKOFF[attempt] if attempt < len(RETRY_BACKOFF) else RETRY_BACKOFF[-1]
+                wait = retry_delay(attempt)
                 logger.warning(
-                    "Voice stream attempt %d/%d failed (%s: %s), retrying in %ds",
+                    "Voice stream attempt %d/%d failed (%s: %s), retrying in %.1fs",
                     attempt + 1, MAX_RETRIES, type(e).__name__, str(e)[:200], wait,
                 )
                 await asyncio.sleep(wait)
 
+    def _emit(self, text: str, sent_urls: set[str]) -> bool:
+        """Send links found in *text*, then push its speakable part to TTS.
+
+        Returns True if anything was sent to the event channel.
+        """
+        # Extract and send URLs before TTS strips them
+        if self._send_link:
+            for url in _extract_urls(text):
+                if url not in sent_urls:
+                    sent_urls.add(url)
+                    self._send_link(url)
+
+        cleaned = _sanitize_for_tts(text)
+        if not cleaned or not cleaned.strip():
+            return False
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id="agno",
+                delta=llm.ChoiceDelta(role="assistant", content=cleaned),
+            )
+        )
+        return True
+
     def _get_user_input(self) -> str | None:
         """Extract the last actionable message from chat context.
 
@@ -212,8 +221,8 @@ class AgnoStream(llm.LLMStream):
         """
         items = self._chat_ctx.items
 
-        # Log what's in the context for debugging
-        if items:
+        # Log what's in the context for debugging (built only when DEBUG is on)
+        if items and logger.isEnabledFor(logging.DEBUG):
             roles = [
                 f"{type(m).__name__}(role={m.role})"
                 if isinstance(m, ChatMessage) else type(m).__name__
@@ -270,6 +279,31 @@ def _sentence_boundary(text: str) -> int:
     return -1
 
 
+# Clause-level early flush for long sentences: release text at the last
+# ", " / "; " / ": " once the buffer passes _SOFT_FLUSH_CHARS, keeping at
+# least _SOFT_MIN_CHARS per piece so TTS gets natural phrases.
+_SOFT_FLUSH_CHARS = 80
+_SOFT_MIN_CHARS = 40
+_SOFT_BREAK_RE = re.compile(r"[,;:](?=\s)")
+# Text the sanitizer must see whole: URLs, JSON, tags, code.
+_SOFT_UNSAFE_RE = re.compile(r"https?:|[{\[<`]")
+
+
+def _soft_boundary(text: str) -> int:
+    """Return index just past the last clause break in a long buffer, or -1.
+
+    Only used when _sentence_boundary() finds nothing. Returns -1 for short
+    buffers and for text containing URLs, JSON, tags or code, which the
+    sanitizer needs to see in full.
+    """
+    if len(text) < _SOFT_FLUSH_CHARS or _SOFT_UNSAFE_RE.search(text):
+        return -1
+    idx = -1
+    for match in _SOFT_BREAK_RE.finditer(text, _SOFT_MIN_CHARS - 1):
+        idx = match.end()
+    return idx
+
+
 # =============================================================================
 # Content extraction
 # =============================================================================
@@ -344,8 +378,10 @@ _JSON_PREFIX_RE = re.compile(r"json\s*(?:\{\})*\{[^}]{0,500}\}", re.IGNORECASE)
 # Standalone "json{}" tokens (empty JSON objects the model spits out)
 _JSON_EMPTY_OBJ_RE = re.compile(r"json\s*\{\}", re.IGNORECASE)
 
-# Raw JSON blobs (objects and arrays) — allow nested braces via [\s\S]
-_JSON_BLOB_RE = re.compile(r"\{[\s\S]{0,5000}\}")
+# Raw JSON blobs (objects and arrays) — allow nested braces. Objects are
+# cut by _strip_json_blobs(): the equivalent greedy regex rescans the
+# whole window from every unclosed "{".
+_JSON_BLOB_MAX_CHARS = 5000
 _JSON_ARRAY_RE = re.compile(r"\[[\s]*\{[\s\S]{0,10000}\}[\s]*\]")
 
 # Quoted JSON key-value pairs: "id":"...", "listingid":"..." etc.
@@ -468,11 +504,47 @@ _SQL_LEAK_RE = re.compile(
 )
 
 
+# Markdown formatting, stripped once the text is known to be speakable
+_MD_HEADER_RE = re.compile(r"#{1,6}\s*")
+_MD_BOLD_RE = re.compile(r"\*{1,3}(.*?)\*{1,3}")
+_MD_UNDERSCORE_RE = re.compile(r"_{1,3}(.*?)_{1,3}")
+_MD_INLINE_CODE_RE = re.compile(r"`([^`]*)`")
+_MD_CODE_FENCE_RE = re.compile(r"```[\s\S]*?```")
+# Neither part may cross a "[", so a run of unclosed brackets is one scan
+_MD_LINK_RE = re.compile(r"\[([^\[\]]+)\]\([^)\[]+\)")
+_MD_BULLET_RE = re.compile(r"(?m)^\s*[-*•]\s+")
+_MD_NUMBERED_RE = re.compile(r"(?m)^\s*\d+\.\s+")
+_MD_HR_RE = re.compile(r"(?m)^[-*_]{3,}\s*$")
+# Newlines and runs of spaces, each collapsed to a single space
+_WHITESPACE_RUN_RE = re.compile(r"[ \n]{2,}|\n")
+# Anything the markdown/whitespace passes could change; plain prose has none
+_MARKDOWN_HINT_RE = re.compile(r"[#*_`\[\n•-]| {2}|^\s*\d+\.\s")
+
+
 def _extract_urls(text: str) -> list[str]:
     """Pull all URLs from text."""
     return _URL_RE.findall(text)
 
 
+def _strip_json_blobs(text: str) -> str:
+    """Remove each "{" and everything up to the last "}" within reach.
+
+    A "{" with no "}" in the next _JSON_BLOB_MAX_CHARS characters is kept.
+    """
+    parts: list[str] = []
+    pos = 0
+    while (start := text.find("{", pos)) != -1:
+        end = text.rfind("}", start + 1, start + _JSON_BLOB_MAX_CHARS + 2)
+        if end == -1:
+            parts.append(text[pos:start + 1])
+            pos = start + 1
+        else:
+            parts.append(text[pos:start])
+            pos = end + 1
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
 def _sanitize_for_tts(text: str) -> str:
     """Strip markdown, reasoning tokens, tool metadata, and special characters
     so TTS reads natural speech only."""
@@ -514,7 +586,7 @@ def _sanitize_for_tts(text: str) -> str:
     text = _JSON_PREFIX_RE.sub("", text)
     # Remove raw JSON blobs and arrays
     text = _JSON_ARRAY_RE.sub("", text)
-    text = _JSON_BLOB_RE.sub("", text)
+    text = _strip_json_blobs(text)
     # Remove quoted empty results: "[]", "{}"
     text = _QUOTED_EMPTY_RE.sub("", text)
 
@@ -531,28 +603,29 @@ def _sanitize_for_tts(text: str) -> str:
 
     # --- Phase 2: Strip markdown formatting ---
 
+    if not _MARKDOWN_HINT_RE.search(text):
+        return text.strip()
+
     # Remove markdown headers (### Header)
-    text = re.sub(r"#{1,6}\s*", "", text)
+    text = _MD_HEADER_RE.sub("", text)
     # Remove bold/italic markers
-    text = re.sub(r"\*{1,3}(.*?)\*{1,3}", r"\1", text)
-    text = re.sub(r"_{1,3}(.*?)_{1,3}", r"\1", text)
+    text = _MD_BOLD_RE.sub(r"\1", text)
+    text = _MD_UNDERSCORE_RE.sub(r"\1", text)
     # Remove inline code backticks
-    text = re.sub(r"`([^`]*)`", r"\1", text)
+    text = _MD_INLINE_CODE_RE.sub(r"\1", text)
     # Remove code fence markers
-    text = re.sub(r"```[\s\S]*?```", "", text)
+    text = _MD_CODE_FENCE_RE.sub("", text)
     # Convert markdown links [text](url) to just the text
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    text = _MD_LINK_RE.sub(r"\1", text)
     # Remove bullet point markers
-    text = re.sub(r"(?m)^\s*[-*•]\s+", "", text)
+    text = _MD_BULLET_RE.sub("", text)
     # Remove numbered list markers
-    text = re.sub(r"(?m)^\s*\d+\.\s+", "", text)
+    text = _MD_NUMBERED_RE.sub("", text)
     # Remove horizontal rules
-    text = re.sub(r"(?m)^[-*_]{3,}\s*$", "", text)
+    text = _MD_HR_RE.sub("", text)
 
     # --- Phase 3: Whitespace cleanup ---
 
-    text = re.sub(r"\n{2,}", " ", text)
-    text = re.sub(r"\n", " ", text)
-    text = re.sub(r" {2,}", " ", text)
+    text = _WHITESPACE_RUN_RE.sub(" ", text)
 
     return text.strip()
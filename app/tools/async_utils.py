@@ -0,0 +1,18 @@
+"""Helpers for exposing blocking tool methods to Agno's async runs."""
+
+import asyncio
+import functools
+
+
+def threaded(method):
+    """Async twin of a sync tool method that runs it via asyncio.to_thread.
+
+    functools.wraps keeps the name, docstring and signature, so Agno builds
+    the same tool schema for the sync and async variants.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await asyncio.to_thread(method, self, *args, **kwargs)
+
+    return wrapper
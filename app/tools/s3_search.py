@@ -1,7 +1,6 @@
 import logging
 import mimetypes
 from typing import Optional
-from urllib.parse import urlparse
 
 import boto3
 import httpx
@@ -2,19 +2,79 @@
 
 Wraps agno.tools.tavily.TavilyTools with consistent defaults
 so all services (chat, diagnostics, voice) share the same configuration.
+Results are cached per (query, max_results) so repeated searches skip
+the Tavily round-trip, and get_search_tools() hands every service the
+same toolkit, so they share one pooled Tavily session. In async runs the
+search executes in a worker thread, so a slow Tavily call never blocks
+the event loop.
 """
 
+import logging
+from functools import lru_cache
+
 from agno.tools.tavily import TavilyTools
+from requests.adapters import HTTPAdapter
 
 from app.config.settings import settings
+from app.core.cache import TTLCache
+from app.tools.async_utils import threaded
+
+logger = logging.getLogger(__name__)
+
+# Shared by every CachedTavilyTools instance in the process
+_search_cache = TTLCache(maxsize=512, ttl=settings.SEARCH_CACHE_TTL)
+
+# Kept-alive connections to api.tavily.com per client. requests' default of
+# 10 means concurrent searches beyond that open (and then drop) throwaway
+# connections instead of reusing warm ones.
+SEARCH_POOL_SIZE = 32
+
+
+class CachedTavilyTools(TavilyTools):
+    """TavilyTools that serves repeated searches from an in-process cache."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("async_tools", [
+            (self.aweb_search_using_tavily, "web_search_using_tavily"),
+        ])
+        super().__init__(**kwargs)
+        self.client.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=SEARCH_POOL_SIZE)
+        )
+
+    def web_search_using_tavily(self, query: str, max_results: int = 5) -> str:
+        key = (" ".join(query.lower().split()), max_results)
+        cached = _search_cache.get(key)
+        if cached is not None:
+            logger.debug("Search cache hit: %s", query[:100])
+            return cached
+        result = super().web_search_using_tavily(query=query, max_results=max_results)
+        if result and result != "No results found.":
+            _search_cache.set(key, result)
+        return result
+
+    # The docstring is the tool description the model sees; keep Tavily's
+    web_search_using_tavily.__doc__ = TavilyTools.web_search_using_tavily.__doc__
+
+    aweb_search_using_tavily = threaded(web_search_using_tavily)
 
 
 def create_search_tools() -> TavilyTools:
     """Create a Tavily search tool with standard settings."""
-    return TavilyTools(
+    return CachedTavilyTools(
         api_key=settings.TAVILY_API_KEY,
         search_depth="basic",
         include_answer=True,
         max_tokens=6000,
         format="markdown",
     )
+
+
+@lru_cache(maxsize=1)
+def get_search_tools() -> TavilyTools:
+    """Return the process-wide search toolkit, creating it on first use.
+
+    Agno copies toolkit functions per run, so the chat, diagnostics and
+    voice agents can all hold this one instance.
+    """
+    return create_search_tools()
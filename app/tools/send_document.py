@@ -1,58 +1,266 @@
+import asyncio
 import logging
+import threading
 import time
 from datetime import datetime, timezone
+from functools import lru_cache
 
 import httpx
 from agno.tools.toolkit import Toolkit
 
+from app.core.retry import retry_delay
+
 logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
-RETRY_BACKOFF = [1, 2, 4]  # seconds between retries
+# A refused connection or failed DNS lookup rarely clears within the
+# backoff window; retry it once (a webhook restart) instead of twice
+MAX_CONNECT_ATTEMPTS = 2
+RETRY_BACKOFF = [1, 2, 4]  # base seconds between retries, jittered up to 2x
+RETRY_MAX_DELAY = 8.0
+WEBHOOK_TIMEOUT = 10.0
+# Bulkhead: sends beyond this many in flight on one client wait for a pooled
+# connection (up to WEBHOOK_TIMEOUT) instead of opening more sockets
+WEBHOOK_MAX_CONNECTIONS = 8
+WEBHOOK_LIMITS = httpx.Limits(
+    max_connections=WEBHOOK_MAX_CONNECTIONS,
+    max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS,
+)
+# Circuit breaker: after this many sends in a row fail, refuse sends for
+# BREAKER_COOLDOWN seconds instead of spending the retry budget on each
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+
+class _CircuitBreaker:
+    """Consecutive-failure breaker for one webhook endpoint.
+
+    CLOSED until ``threshold`` sends in a row fail, then OPEN: sends are
+    refused for ``cooldown`` seconds. After that a single trial send is let
+    through (HALF_OPEN); its outcome closes the circuit or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.fail_count = 0
+        self.opened_at = 0.0
+        self.state = self.CLOSED
+        # Sync sends run in Agno's worker threads, async ones on the loop
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a send may go out now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # Also re-admits a trial whose outcome was never recorded
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.fail_count = 0
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.fail_count += 1
+            if self.state == self.HALF_OPEN or self.fail_count >= self.threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        "Webhook circuit open after %d consecutive failures; "
+                        "skipping sends for %.0fs",
+                        self.fail_count, self.cooldown,
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+@lru_cache(maxsize=1)
+def _default_client() -> httpx.Client:
+    """Return the process-wide sync webhook client, creating it on first use.
+
+    Unlike an AsyncClient it isn't bound to an event loop, so every
+    SendDocumentTool built without its own client posts through this pool.
+    """
+    return httpx.Client(timeout=WEBHOOK_TIMEOUT, limits=WEBHOOK_LIMITS)
 
 
 class SendDocumentTool(Toolkit):
     """Agno tool that sends document URLs to users via a webhook."""
 
-    def __init__(self, webhook_url: str, webhook_secret: str | None = None):
+    def __init__(
+        self,
+        webhook_url: str,
+        webhook_secret: str | None = None,
+        client: httpx.Client | None = None,
+    ):
         super().__init__(name="send_document")
         self.webhook_url = webhook_url
         self.webhook_secret = webhook_secret
+        # Sync sends use the caller's client, else the shared default;
+        # the tool closes neither
+        self._sync_client = client
+        # Created on first async send, bound to the running event loop;
+        # closed by aclose()
+        self._async_client: httpx.AsyncClient | None = None
+        # Tracks self.webhook_url, the only endpoint this tool posts to
+        self._breaker = _CircuitBreaker()
         self.register(self.send_document)
+        # Preferred by Agno in async runs: retries wait on the event loop
+        # instead of holding a worker thread through the backoff
+        self.register(self.asend_document, name="send_document")
+
+    def _client(self) -> httpx.Client:
+        if self._sync_client is None:
+            return _default_client()
+        return self._sync_client
+
+    async def aclose(self) -> None:
+        """Close the tool's own async webhook connections."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    @staticmethod
+    def _retry_error(response: httpx.Response) -> httpx.HTTPStatusError | None:
+        """The error to retry on for a 5xx response, or None to return it as-is."""
+        # Don't retry client errors (4xx) — only server errors (5xx)
+        if response.status_code < 500:
+            return None
+        return httpx.HTTPStatusError(
+            f"Server error {response.status_code}",
+            request=response.request,
+            response=response,
+        )
+
+    @staticmethod
+    def _next_wait(attempt: int) -> float:
+        wait = retry_delay(attempt, RETRY_BACKOFF, max_delay=RETRY_MAX_DELAY)
+        logger.warning(
+            "Webhook attempt %d/%d failed, retrying in %.1fs",
+            attempt + 1, MAX_RETRIES, wait,
+        )
+        return wait
 
     def _post(self, payload: dict, headers: dict) -> httpx.Response:
         """POST with retry logic for transient failures."""
         last_exception = None
         for attempt in range(MAX_RETRIES):
             try:
-                response = httpx.post(
-                    self.webhook_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0,
+                response = self._client().post(
+                    self.webhook_url, json=payload, headers=headers
                 )
-                # Don't retry client errors (4xx) — only server errors (5xx)
-                if response.status_code < 500:
+                last_exception = self._retry_error(response)
+                if last_exception is None:
                     return response
-                last_exception = httpx.HTTPStatusError(
-                    f"Server error {response.status_code}",
-                    request=response.request,
-                    response=response,
-                )
-            except (httpx.TimeoutException, httpx.ConnectError) as e:
+            except httpx.ConnectError as e:
+                last_exception = e
+                if attempt + 1 >= MAX_CONNECT_ATTEMPTS:
+                    break
+            except httpx.TimeoutException as e:
                 last_exception = e
 
             if attempt < MAX_RETRIES - 1:
-                wait = RETRY_BACKOFF[attempt]
-                logger.warning(
-                    "Webhook attempt %d/%d failed, retrying in %ds",
-                    attempt + 1, MAX_RETRIES, wait,
-                )
-                time.sleep(wait)
+                time.sleep(self._next_wait(attempt))
 
         # All retries exhausted — raise the last exception
         raise last_exception
 
+    async def _apost(self, payload: dict, headers: dict) -> httpx.Response:
+        """Async _post over a kept-alive client, backing off with asyncio.sleep."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT, limits=WEBHOOK_LIMITS)
+        last_exception = None
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = await self._async_client.post(
+                    self.webhook_url, json=payload, headers=headers
+                )
+                last_exception = self._retry_error(response)
+                if last_exception is None:
+                    return response
+            except httpx.ConnectError as e:
+                last_exception = e
+                if attempt + 1 >= MAX_CONNECT_ATTEMPTS:
+                    break
+            except httpx.TimeoutException as e:
+                last_exception = e
+
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(self._next_wait(attempt))
+
+        raise last_exception
+
+    def _payload(
+        self,
+        title: str,
+        url: str,
+        recipient: str,
+        work_order_id: str,
+        session_id: str,
+        target: str,
+    ) -> dict:
+        inner = {
+            "title": title,
+            "url": url,
+            "recipient": recipient,
+            "workOrderId": work_order_id,
+            "sessionId": session_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+        if target:
+            inner["target"] = target
+
+        if self.webhook_secret:
+            inner["webhookSecret"] = self.webhook_secret
+
+        # tRPC mutations expect the input wrapped in {"json": {...}}
+        return {"json": inner}
+
+    def _short_circuit(self, title: str, url: str) -> str | None:
+        """The tool's reply if this send is refused before any request, else None."""
+        # Bad arguments fail the same way on every attempt; don't spend
+        # retries (or a half-open trial) finding that out from the webhook
+        if not title:
+            return "Failed to send document: a title is required."
+        try:
+            scheme = httpx.URL(url).scheme  # lowercased by httpx
+        except httpx.InvalidURL:
+            scheme = ""
+        if scheme not in {"http", "https"}:
+            return f"Failed to send document '{title}': the URL must start with http:// or https://."
+        if self._breaker.allow():
+            return None
+        logger.warning("Webhook circuit open, skipping document: %s", title)
+        return f"Failed to send document '{title}': the delivery service is unavailable, try again later."
+
+    @staticmethod
+    def _result(title: str, url: str, error: httpx.HTTPError | None = None) -> str:
+        """The tool's reply for a delivery that succeeded, or failed with *error*."""
+        if error is None:
+            logger.info("Document sent via webhook: %s -> %s", title, url)
+            return f"Document '{title}' has been sent successfully."
+        if isinstance(error, httpx.TimeoutException):
+            logger.error("Webhook timeout sending document after %d attempts: %s", MAX_RETRIES, title)
+            return f"Failed to send document '{title}': the request timed out after {MAX_RETRIES} attempts."
+        if isinstance(error, httpx.HTTPStatusError):
+            logger.error("Webhook error %s sending document: %s", error.response.status_code, title)
+            return f"Failed to send document '{title}': received status {error.response.status_code}."
+        attempts = MAX_CONNECT_ATTEMPTS if isinstance(error, httpx.ConnectError) else MAX_RETRIES
+        logger.error("Webhook request failed for document %s after %d attempts: %s", title, attempts, error)
+        return f"Failed to send document '{title}': could not reach the delivery service after {attempts} attempts."
+
     def send_document(
         self,
         title: str,
@@ -80,37 +288,53 @@ class SendDocumentTool(Toolkit):
         Returns:
             A message confirming whether the document was sent successfully.
         """
-        inner = {
-            "title": title,
-            "url": url,
-            "recipient": recipient,
-            "workOrderId": work_order_id,
-            "sessionId": session_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
-
-        if target:
-            inner["target"] = target
-
-        if self.webhook_secret:
-            inner["webhookSecret"] = self.webhook_secret
+        url = url.strip()
+        refused = self._short_circuit(title, url)
+        if refused is not None:
+            return refused
+        payload = self._payload(title, url, recipient, work_order_id, session_id, target)
+        headers = {}
 
-        # tRPC mutations expect the input wrapped in {"json": {...}}
-        payload = {"json": inner}
+        try:
+            response = self._post(payload, headers)
+        except httpx.HTTPError as e:
+            self._breaker.record_failure()
+            return self._result(title, url, e)
+        # Any response _post returns (2xx-4xx) means the webhook is up
+        self._breaker.record_success()
+        try:
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            return self._result(title, url, e)
+        return self._result(title, url)
 
+    async def asend_document(
+        self,
+        title: str,
+        url: str,
+        recipient: str = "",
+        work_order_id: str = "",
+        session_id: str = "",
+        target: str = "",
+    ) -> str:
+        url = url.strip()
+        refused = self._short_circuit(title, url)
+        if refused is not None:
+            return refused
+        payload = self._payload(title, url, recipient, work_order_id, session_id, target)
         headers = {}
 
         try:
-            response = self._post(payload, headers)
+            response = await self._apost(payload, headers)
+        except httpx.HTTPError as e:
+            self._breaker.record_failure()
+            return self._result(title, url, e)
+        self._breaker.record_success()
+        try:
             response.raise_for_status()
-            logger.info("Document sent via webhook: %s -> %s", title, url)
-            return f"Document '{title}' has been sent successfully."
-        except httpx.TimeoutException:
-            logger.error("Webhook timeout sending document after %d attempts: %s", MAX_RETRIES, title)
-            return f"Failed to send document '{title}': the request timed out after {MAX_RETRIES} attempts."
-        except httpx.HTTPStatusError as e:
-            logger.error("Webhook error %s sending document: %s", e.response.status_code, title)
-            return f"Failed to send document '{title}': received status {e.response.status_code}."
         except httpx.HTTPError as e:
-            logger.error("Webhook request failed for document %s after %d attempts: %s", title, MAX_RETRIES, e)
-            return f"Failed to send document '{title}': could not reach the delivery service after {MAX_RETRIES} attempts."
+            return self._result(title, url, e)
+        return self._result(title, url)
+
+    # The docstring is the tool description the model sees; keep the sync one
+    asend_document.__doc__ = send_document.__doc__
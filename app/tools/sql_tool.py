@@ -4,6 +4,9 @@ Wraps agno.tools.sql.SQLTools with:
 - Hard block on INSERT, UPDATE, DELETE, DROP, ALTER, CREATE, TRUNCATE, GRANT, REVOKE
 - describe_table returns column names and types only (no nullable/default metadata)
 - Centralized factory so all three services use the same config
+- Async variants that run queries in a worker thread, so agent.arun()
+  never blocks the event loop on a Turso round-trip
+- Short-lived result cache for repeated SELECTs and schema lookups
 """
 
 import json
@@ -13,6 +16,10 @@ import re
 from agno.tools.sql import SQLTools
 from sqlalchemy import Engine
 
+from app.config.settings import settings
+from app.core.cache import TTLCache
+from app.tools.async_utils import threaded
+
 logger = logging.getLogger(__name__)
 
 # Statements that must never run
@@ -21,53 +28,123 @@ _WRITE_RE = re.compile(
     re.IGNORECASE,
 )
 
+# Shared by every ReadOnlySQLTools instance in the process. Query results
+# go stale as work orders change, so they are kept briefly; the schema
+# only changes on deploys.
+SCHEMA_CACHE_TTL = 3600
+_query_cache = TTLCache(maxsize=2048, ttl=settings.SQL_CACHE_TTL)
+_schema_cache = TTLCache(maxsize=256, ttl=SCHEMA_CACHE_TTL)
+
+
+# libSQL/Hrana errors for a stream Turso has already closed. Matched exactly:
+# "stream" alone also appears in ordinary errors ("no such column: downstream_id")
+_STALE_STREAM_RE = re.compile(
+    r"\bSTREAM_EXPIRED\b|\bstream (?:not found|(?:is |has been |already )?(?:closed|expired))\b",
+    re.IGNORECASE,
+)
+
+
+def _is_stale_connection(exc: Exception) -> bool:
+    """True for libSQL errors raised when Turso has closed the connection's stream."""
+    return _STALE_STREAM_RE.search(str(exc)) is not None
+
 
 class ReadOnlySQLTools(SQLTools):
     """SQLTools subclass that blocks all write operations."""
 
+    def __init__(self, **kwargs):
+        # libsql has no async SQLAlchemy driver; in async runs Agno prefers
+        # these variants, which move the blocking query to a worker thread.
+        kwargs.setdefault("async_tools", [
+            (self.alist_tables, "list_tables"),
+            (self.adescribe_table, "describe_table"),
+            (self.arun_sql_query, "run_sql_query"),
+        ])
+        super().__init__(**kwargs)
+        # Cache entries are per engine (one per process), not per toolkit instance
+        self._cache_ns = id(self.db_engine)
+
+    def list_tables(self) -> str:
+        key = (self._cache_ns, self.schema)
+        cached = _schema_cache.get(key)
+        if cached is not None:
+            return cached
+        result = super().list_tables()
+        if not result.startswith("Error"):
+            _schema_cache.set(key, result)
+        return result
+
+    list_tables.__doc__ = SQLTools.list_tables.__doc__
+
     def describe_table(self, table_name: str) -> str:
         """Return column names and types only — no nullable/default metadata."""
+        key = (self._cache_ns, self.schema, table_name)
+        cached = _schema_cache.get(key)
+        if cached is not None:
+            return cached
         try:
             from sqlalchemy import inspect as sa_inspect
 
             inspector = sa_inspect(self.db_engine)
             columns = inspector.get_columns(table_name, schema=self.schema)
-            return json.dumps(
+            result = json.dumps(
                 [{"name": col["name"], "type": str(col["type"])} for col in columns]
             )
         except Exception as e:
             logger.error("Error getting table schema: %s", e)
             return f"Error getting table schema: {e}"
+        _schema_cache.set(key, result)
+        return result
 
     def run_sql_query(self, query: str, limit: int | None = 10) -> str:
         """Run a SELECT query only. Rejects any write statements."""
         if _WRITE_RE.search(query):
             logger.warning("Blocked write query: %s", query[:200])
             return "Error: Only SELECT queries are allowed. This database is read-only."
-        try:
-            return super().run_sql_query(query=query, limit=limit)
-        except Exception as e:
-            if "STREAM_EXPIRED" in str(e) or "stream" in str(e).lower():
-                logger.debug("Stale connection in run_sql_query, disposing pool and retrying")
-                try:
-                    self.db_engine.dispose()
-                except Exception:
-                    pass
-                return super().run_sql_query(query=query, limit=limit)
-            raise
+        # Only surrounding whitespace is normalized: inside string literals
+        # spacing and case are significant
+        key = (self._cache_ns, query.strip().rstrip(";").rstrip(), limit)
+        cached = _query_cache.get(key)
+        if cached is not None:
+            logger.debug("SQL cache hit: %s", query[:200])
+            return cached
+        # SQLTools.run_sql_query turns errors into an "Error ..." string;
+        # the stale-connection retry lives in run_sql(), which it calls
+        result = super().run_sql_query(query=query, limit=limit)
+        if not result.startswith("Error"):
+            _query_cache.set(key, result)
+        return result
 
     def run_sql(self, sql: str, limit: int | None = None) -> list[dict]:
         """Run a SELECT query only. Rejects any write statements."""
         if _WRITE_RE.search(sql):
             logger.warning("Blocked write query: %s", sql[:200])
             raise PermissionError("Only SELECT queries are allowed. This database is read-only.")
-        return super().run_sql(sql=sql, limit=limit)
+        try:
+            return super().run_sql(sql=sql, limit=limit)
+        except Exception as e:
+            if not _is_stale_connection(e):
+                raise
+            # pool_pre_ping covers idle connections; this catches a Turso
+            # stream that expired between the ping and the query
+            logger.debug("Stale connection in run_sql, disposing pool and retrying")
+            try:
+                self.db_engine.dispose()
+            except Exception:
+                pass
+            return super().run_sql(sql=sql, limit=limit)
+
+    alist_tables = threaded(list_tables)
+    adescribe_table = threaded(describe_table)
+    arun_sql_query = threaded(run_sql_query)
 
 
 def create_sql_tools(db_engine: Engine) -> ReadOnlySQLTools:
-    """Create a fresh read-only SQLTools instance.
+    """Create a read-only SQLTools instance.
 
-    Call this per-request to avoid connection expiration with Turso/libSQL.
+    The toolkit checks connections out of *db_engine* per query, so one
+    instance can serve every run; pool_pre_ping/pool_recycle on the engine
+    deal with Turso/libSQL dropping idle connections.
     """
     return ReadOnlySQLTools(db_engine=db_engine)
 
@@ -20,7 +20,7 @@ start_api() {
         return 1
     fi
     echo "Starting API server..."
-    nohup uvicorn app.main:app --host 0.0.0.0 --port 8090 > "$API_LOG_FILE" 2>&1 &
+    nohup uvicorn app.main:app --host 0.0.0.0 --port 8090 --loop uvloop --http httptools --ws none --timeout-keep-alive 30 --limit-concurrency 1024 > "$API_LOG_FILE" 2>&1 &
     echo $! > "$API_PID_FILE"
     echo "API server started (PID: $(cat "$API_PID_FILE"))"
 }
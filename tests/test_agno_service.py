@@ -1,5 +1,6 @@
 """Tests for AgnoService in app/services/agno_service.py."""
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -13,9 +14,17 @@ from agno.agent import (
     ToolCallCompletedEvent,
     ToolCallStartedEvent,
 )
+from agno.models.message import Message
 from agno.run.agent import RunOutput
-
-from app.services.agno_service import AgnoService
+from agno.run.base import RunStatus
+
+from app.services.agno_service import (
+    _HEARTBEAT,
+    SYSTEM_PROMPT,
+    AgnoService,
+    _coalesce_content,
+    _preview,
+)
 
 
 # --- Initialization ---
@@ -25,7 +34,7 @@ from app.services.agno_service import AgnoService
 async def test_initialize():
     service = AgnoService()
     with (
-        patch("app.services.agno_service.create_search_tools") as MockDDG,
+        patch("app.services.agno_service.get_search_tools") as MockDDG,
         patch("app.services.agno_service.create_sql_tools") as MockSQL,
         patch("app.services.agno_service.Agent") as MockAgent,
     ):
@@ -35,13 +44,42 @@ async def test_initialize():
     assert service.agent is not None
     MockDDG.assert_called_once()
     MockAgent.assert_called_once()
+    model = MockAgent.call_args.kwargs["model"]
+    assert model.request_params == {"prompt_cache_key": "alex-chat"}
+    assert MockAgent.call_args.kwargs["resolve_in_context"] is False
+    assert MockAgent.call_args.kwargs["system_message"].startswith("You are Alex")
+    assert MockAgent.call_args.kwargs["telemetry"] is False
+
+
+def test_system_prompt_keeps_hard_rules():
+    """The compact prompt still carries the rules other code relies on."""
+    assert f'"{AgnoService._DB_BLOCK_RESPONSE}"' in SYSTEM_PROMPT
+    assert 'target="preventive-maintenance"' in SYSTEM_PROMPT
+    assert '"listing" (not "listings")' in SYSTEM_PROMPT
+
+
+@pytest.mark.asyncio
+async def test_warmup_opens_pool_connection():
+    service = AgnoService()
+    with patch("app.services.agno_service.ENGINE") as mock_engine:
+        await service.warmup()
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    conn.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_warmup_swallows_db_errors():
+    service = AgnoService()
+    with patch("app.services.agno_service.ENGINE") as mock_engine:
+        mock_engine.connect.side_effect = OSError("network down")
+        await service.warmup()  # does not raise
 
 
 @pytest.mark.asyncio
 async def test_initialize_idempotent():
     service = AgnoService()
     with (
-        patch("app.services.agno_service.create_search_tools"),
+        patch("app.services.agno_service.get_search_tools"),
         patch("app.services.agno_service.create_sql_tools"),
         patch("app.services.agno_service.Agent") as MockAgent,
     ):
@@ -51,12 +89,44 @@ async def test_initialize_idempotent():
     MockAgent.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_initialize_concurrent_builds_agent_once():
+    service = AgnoService()
+    with (
+        patch("app.services.agno_service.get_search_tools"),
+        patch("app.services.agno_service.create_sql_tools"),
+        patch("app.services.agno_service.Agent") as MockAgent,
+    ):
+        await asyncio.gather(*(service.ensure_initialized() for _ in range(5)))
+
+    MockAgent.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_reinitialize_after_cleanup_does_not_duplicate_tools():
+    service = AgnoService()
+    with (
+        patch("app.services.agno_service.get_search_tools"),
+        patch("app.services.agno_service.create_sql_tools"),
+        patch("app.services.agno_service.Agent"),
+        patch("app.services.agno_service.SendDocumentTool") as MockTool,
+        patch("app.services.agno_service.settings.DOCUMENT_WEBHOOK_URL", "https://hook"),
+    ):
+        MockTool.return_value.aclose = AsyncMock()
+        await service.initialize()
+        await service.cleanup()
+        await service.initialize()
+
+    assert len(service._extra_tools) == 1
+    MockTool.return_value.aclose.assert_awaited_once()  # webhook client closed on cleanup
+
+
 @pytest.mark.asyncio
 async def test_initialize_error():
     service = AgnoService()
     with (
         patch(
-            "app.services.agno_service.create_search_tools",
+            "app.services.agno_service.get_search_tools",
             side_effect=RuntimeError("fail"),
         ),
         pytest.raises(RuntimeError, match="fail"),
@@ -76,7 +146,7 @@ async def test_cleanup(agno_service_instance):
 async def test_ensure_initialized_calls_init():
     service = AgnoService()
     with (
-        patch("app.services.agno_service.create_search_tools"),
+        patch("app.services.agno_service.get_search_tools"),
         patch("app.services.agno_service.create_sql_tools"),
         patch("app.services.agno_service.Agent"),
     ):
@@ -98,8 +168,9 @@ async def test_chat_returns_response(agno_service_instance):
 @pytest.mark.asyncio
 async def test_chat_generates_session_id(agno_service_instance):
     result = await agno_service_instance.chat(message="Hi")
-    assert result["session_id"]  # non-empty UUID string
-    assert len(result["session_id"]) == 36  # UUID format
+    assert result["session_id"]  # non-empty random hex string
+    assert len(result["session_id"]) == 32  # 128 bits, hex-encoded
+    int(result["session_id"], 16)
 
 
 @pytest.mark.asyncio
@@ -109,10 +180,12 @@ async def test_chat_preserves_session_id(agno_service_instance):
 
 
 @pytest.mark.asyncio
-async def test_chat_creates_fresh_sql_tools(agno_service_instance, mock_sql_tools):
+async def test_chat_reuses_agent_tools(agno_service_instance):
+    tools = agno_service_instance.agent.tools
     await agno_service_instance.chat(message="Hi", session_id="s1")
-    agno_service_instance._create_sql_tools.assert_called_once()
-    assert mock_sql_tools in agno_service_instance.agent.tools
+    await agno_service_instance.chat(message="Hello", session_id="s1")
+    agno_service_instance._create_sql_tools.assert_not_called()
+    assert agno_service_instance.agent.tools is tools
 
 
 @pytest.mark.asyncio
@@ -133,6 +206,271 @@ async def test_chat_error_propagates(agno_service_instance):
         with pytest.raises(RuntimeError, match="API error"):
             await agno_service_instance.chat(message="Hi", session_id="s1")
 
+    agno_service_instance.agent.arun.assert_awaited_once()  # not transient, no retry
+
+
+@pytest.mark.asyncio
+async def test_chat_failed_run_raises_and_is_not_cached(agno_service_instance):
+    """Agno returns a failed run as content; chat must not answer with it."""
+    agno_service_instance.agent.arun = AsyncMock(
+        return_value=RunOutput(content="Connection error.", status=RunStatus.error)
+    )
+    with pytest.raises(RuntimeError, match="Connection error"):
+        await agno_service_instance.chat(message="Hi", session_id="s1")
+    assert len(agno_service_instance._response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_serves_repeat_message_from_cache(agno_service_instance):
+    first = await agno_service_instance.chat(message="Oil  capacity?", session_id="s1")
+    second = await agno_service_instance.chat(message="oil capacity?", session_id="s1")
+    assert second == first
+    agno_service_instance.agent.arun.assert_awaited_once()
+
+
+def test_cache_key_ignores_case_spacing_trailing_punctuation_and_unused_metadata():
+    key = AgnoService._response_cache_key
+    assert key("How do I reset the DPF?", [], "u1", None) == key(
+        "how do i  reset the dpf", [], "u1", None
+    )
+    assert key("Hi", [], "u1", '{"listing_id": "L1", "ts": 1}') == key(
+        "Hi", [], "u1", '{"ts": 2,  "listing_id": "L1"}'
+    )
+    assert key("Hi", [], "u1", '{"listing_id": "L1"}') != key(
+        "Hi", [], "u1", '{"listing_id": "L2"}'
+    )
+
+
+def test_cache_key_keeps_meaningful_punctuation():
+    key = AgnoService._response_cache_key
+    assert key("Start at -40°F?", [], "u1", None) != key("Start at 40 F?", [], "u1", None)
+    assert key("Alarm at > 50 psi", [], "u1", None) != key("Alarm at < 50 psi", [], "u1", None)
+
+
+def test_cache_key_includes_history():
+    key = AgnoService._response_cache_key
+    earlier = [Message(role="user", content="CAT 320"), Message(role="assistant", content="OK")]
+    assert key("Oil capacity", [], "u1", None) != key("Oil capacity", earlier, "u1", None)
+
+
+@pytest.mark.asyncio
+async def test_chat_cache_is_scoped_to_history_and_user(agno_service_instance):
+    agent = agno_service_instance.agent
+    histories = {
+        "s1": [],
+        "s2": [Message(role="user", content="CAT 320"), Message(role="assistant", content="OK")],
+    }
+    agent.aget_session_messages = AsyncMock(side_effect=lambda session_id, **kw: histories[session_id])
+    await agno_service_instance.chat(message="Hi", session_id="s1", user_id="u1")
+    await agno_service_instance.chat(message="Hi", session_id="s2", user_id="u1")
+    await agno_service_instance.chat(message="Hi", session_id="s1", user_id="u2")
+    assert agent.arun.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_chat_cache_hit_is_answered_and_recorded_in_own_session(agno_service_instance):
+    agent = agno_service_instance.agent
+    agent.db = MagicMock()
+    first = await agno_service_instance.chat(message="Hi")
+    second = await agno_service_instance.chat(message="Hi")
+
+    agent.arun.assert_awaited_once()
+    assert second["response"] == first["response"]
+    assert second["session_id"] != first["session_id"]  # never another request's session
+    session = agent.db.upsert_session.call_args.args[0]
+    assert session.session_id == second["session_id"]
+    run = agent.db.upsert_run.call_args.kwargs["run"]
+    assert agent.db.upsert_run.call_args.kwargs["session_id"] == second["session_id"]
+    assert [(m.role, m.content) for m in run.messages] == [("user", "Hi"), ("assistant", "Test response")]
+
+
+@pytest.mark.asyncio
+async def test_chat_use_cache_false_bypasses_cache(agno_service_instance):
+    await agno_service_instance.chat(message="Hi", session_id="s1")
+    await agno_service_instance.chat(message="Hi", session_id="s1", use_cache=False)
+    assert agno_service_instance.agent.arun.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_joins_identical_inflight_request(agno_service_instance):
+    release = asyncio.Event()
+
+    async def slow_run(**kwargs):
+        await release.wait()
+        return RunOutput(content="Shared answer")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=slow_run)
+    tasks = [
+        asyncio.create_task(agno_service_instance.chat(message="Hi", session_id="s1"))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert all(r["response"] == "Shared answer" for r in results)
+    agno_service_instance.agent.arun.assert_awaited_once()
+    assert agno_service_instance._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_chat_inflight_survives_leader_cancellation(agno_service_instance):
+    release = asyncio.Event()
+
+    async def slow_run(**kwargs):
+        await release.wait()
+        return RunOutput(content="Shared answer")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=slow_run)
+    leader = asyncio.create_task(agno_service_instance.chat(message="Hi", session_id="s1"))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(agno_service_instance.chat(message="Hi", session_id="s1"))
+    await asyncio.sleep(0)
+    leader.cancel()  # the leader's client disconnects
+    await asyncio.sleep(0)
+    release.set()
+
+    assert (await joiner)["response"] == "Shared answer"
+    assert leader.cancelled()
+    agno_service_instance.agent.arun.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_chat_new_sessions_never_join_inflight(agno_service_instance):
+    release = asyncio.Event()
+
+    async def slow_run(**kwargs):
+        await release.wait()
+        return RunOutput(content="Answer")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=slow_run)
+    tasks = [asyncio.create_task(agno_service_instance.chat(message="Hi")) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert agno_service_instance.agent.arun.await_count == 2
+    assert results[0]["session_id"] != results[1]["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chats_run_in_parallel(agno_service_instance):
+    in_flight = 0
+    peak = 0
+
+    async def run(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return RunOutput(content=f"Answer for {kwargs['session_id']}")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=run)
+    tools = agno_service_instance.agent.tools
+    results = await asyncio.gather(
+        *(agno_service_instance.chat(message="Hi", session_id=f"s{i}") for i in range(4))
+    )
+
+    assert peak == 4
+    assert [r["response"] for r in results] == [f"Answer for s{i}" for i in range(4)]
+    assert agno_service_instance.agent.tools is tools
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_bounds_concurrency_and_keeps_order(agno_service_instance):
+    in_flight = 0
+    peak = 0
+
+    async def run(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return RunOutput(content=f"A: {kwargs['input'][-1].content}")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=run)
+    messages = [f"question {i}" for i in range(5)]
+    results = await agno_service_instance.chat_batch(messages, max_concurrency=2)
+
+    assert peak == 2
+    assert [r["response"] for r in results] == [f"A: {m}" for m in messages]
+    assert len({r["session_id"] for r in results}) == 5
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_runs_duplicates_in_separate_sessions(agno_service_instance):
+    agent = agno_service_instance.agent
+    agent.arun = AsyncMock(return_value=RunOutput(content="Answer"))
+
+    results = await agno_service_instance.chat_batch(["Same question"] * 3)
+
+    assert [r["response"] for r in results] == ["Answer"] * 3
+    assert len({r["session_id"] for r in results}) == 3  # hits answered in their own sessions
+    assert agent.arun.call_args.kwargs["session_id"] in {r["session_id"] for r in results}
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_reports_failures_per_message(agno_service_instance):
+    async def run(**kwargs):
+        if kwargs["input"][-1].content == "bad":
+            raise RuntimeError("model unavailable")
+        return RunOutput(content="ok")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=run)
+    results = await agno_service_instance.chat_batch(["good", "bad", "good again"], use_cache=False)
+
+    assert results[1] == {"error": "model unavailable"}
+    assert [results[0]["response"], results[2]["response"]] == ["ok", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_chat_sends_budgeted_history_before_message(agno_service_instance):
+    agent = agno_service_instance.agent
+    agent.aget_session_messages = AsyncMock(return_value=[
+        Message(role="user", content="old question"),
+        Message(role="assistant", content="old answer"),
+    ])
+    await agno_service_instance.chat(message="Follow up", session_id="s1", use_cache=False)
+
+    sent = agent.arun.call_args.kwargs["input"]
+    assert [(m.role, m.content) for m in sent] == [
+        ("user", "old question"), ("assistant", "old answer"), ("user", "Follow up"),
+    ]
+    assert sent[0].from_history and not sent[-1].from_history
+
+
+@pytest.mark.asyncio
+async def test_chat_new_session_skips_history_read(agno_service_instance):
+    agent = agno_service_instance.agent
+    agent.aget_session_messages = AsyncMock(return_value=[])
+    await agno_service_instance.chat(message="Hi", use_cache=False)
+
+    agent.aget_session_messages.assert_not_called()
+    assert [m.content for m in agent.arun.call_args.kwargs["input"]] == ["Hi"]
+
+
+@pytest.mark.asyncio
+async def test_chat_inflight_error_reaches_all_waiters(agno_service_instance):
+    release = asyncio.Event()
+
+    async def failing_run(**kwargs):
+        await release.wait()
+        raise ValueError("bad request")
+
+    agno_service_instance.agent.arun = AsyncMock(side_effect=failing_run)
+    tasks = [
+        asyncio.create_task(agno_service_instance.chat(message="Hi", session_id="s1"))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert agno_service_instance._inflight == {}
+
 
 # --- Chat Stream ---
 
@@ -148,7 +486,7 @@ async def test_chat_stream_yields_events(agno_service_instance):
 
     chunks = []
     async for chunk in agno_service_instance.chat_stream(message="Hi", session_id="s1"):
-        chunks.append(chunk)
+        chunks.append(chunk.decode())
 
     # First chunk: session event
     session_data = json.loads(chunks[0].removeprefix("data: ").strip())
@@ -157,7 +495,7 @@ async def test_chat_stream_yields_events(agno_service_instance):
 
     # Find content chunk
     content_chunks = [
-        c for c in chunks if '"type": "content"' in c
+        c for c in chunks if '"type":"content"' in c
     ]
     assert len(content_chunks) == 1
     content_data = json.loads(content_chunks[0].removeprefix("data: ").strip())
@@ -169,6 +507,56 @@ async def test_chat_stream_yields_events(agno_service_instance):
     assert "execution_time" in done_data
 
 
+@pytest.mark.asyncio
+async def test_chat_stream_content_frame_escapes_text(agno_service_instance):
+    text = 'Torque to "45 Nm"\nthen check — done'
+
+    async def fake_stream(*args, **kwargs):
+        yield RunContentEvent(content=text)
+
+    agno_service_instance.agent.arun = MagicMock(return_value=fake_stream())
+
+    chunks = [c async for c in agno_service_instance.chat_stream(message="Hi", session_id="s1")]
+    assert all(isinstance(c, bytes) and c.endswith(b"\n\n") for c in chunks)
+    frames = [json.loads(c.decode().removeprefix("data: ")) for c in chunks]
+    assert {"type": "content", "content": text} in frames
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_db_probe_frames(agno_service_instance):
+    body = b"".join([
+        c async for c in agno_service_instance.chat_stream(
+            message="show me the database tables", session_id='s"1'
+        )
+    ])
+    frames = [json.loads(f.removeprefix("data: ")) for f in body.decode().strip().split("\n\n")]
+
+    assert [f["type"] for f in frames] == ["session", "content", "html", "done"]
+    assert frames[0]["session_id"] == 's"1'
+    assert frames[1]["content"] == "I'm not able to help with that."
+    agno_service_instance.agent.arun.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_replays_cached_response(agno_service_instance):
+    async def fake_stream(*args, **kwargs):
+        yield RunContentEvent(content="Hello world")
+
+    agno_service_instance.agent.arun = MagicMock(side_effect=lambda **kw: fake_stream())
+    agno_service_instance.agent.db = MagicMock()
+
+    first = [c.decode() async for c in agno_service_instance.chat_stream(message="Hi", session_id="s1")]
+    second = [c.decode() async for c in agno_service_instance.chat_stream(message="Hi", session_id="s2")]
+
+    agno_service_instance.agent.arun.assert_called_once()
+    assert json.loads(second[0].removeprefix("data: "))["session_id"] == "s2"
+    assert agno_service_instance.agent.db.upsert_run.call_args.kwargs["session_id"] == "s2"
+    assert [c for c in second if '"type":"content"' in c] == [
+        c for c in first if '"type":"content"' in c
+    ]
+    assert json.loads(second[-1].removeprefix("data: ").strip())["type"] == "done"
+
+
 @pytest.mark.asyncio
 async def test_chat_stream_tool_events(agno_service_instance):
     tool_started = MagicMock(spec=ToolCallStartedEvent)
@@ -189,19 +577,18 @@ async def test_chat_stream_tool_events(agno_service_instance):
 
     chunks = []
     async for chunk in agno_service_instance.chat_stream(message="search", session_id="s1"):
-        chunks.append(chunk)
+        chunks.append(chunk.decode())
 
-    tool_start_chunks = [c for c in chunks if '"type": "tool_start"' in c]
+    tool_start_chunks = [c for c in chunks if '"type":"tool_start"' in c]
     assert len(tool_start_chunks) == 1
 
-    tool_complete_chunks = [c for c in chunks if '"type": "tool_complete"' in c]
+    tool_complete_chunks = [c for c in chunks if '"type":"tool_complete"' in c]
     assert len(tool_complete_chunks) == 1
 
 
 @pytest.mark.asyncio
 async def test_chat_stream_error_event(agno_service_instance):
-    error_event = MagicMock(spec=RunErrorEvent)
-    error_event.error = "Something went wrong"
+    error_event = RunErrorEvent(content="Something went wrong")
 
     async def fake_stream(*args, **kwargs):
         yield error_event
@@ -210,10 +597,11 @@ async def test_chat_stream_error_event(agno_service_instance):
 
     chunks = []
     async for chunk in agno_service_instance.chat_stream(message="Hi", session_id="s1"):
-        chunks.append(chunk)
+        chunks.append(chunk.decode())
 
-    error_chunks = [c for c in chunks if '"type": "error"' in c]
+    error_chunks = [c for c in chunks if '"type":"error"' in c]
     assert len(error_chunks) == 1
+    assert "Something went wrong" in error_chunks[0]
 
 
 @pytest.mark.asyncio
@@ -228,9 +616,79 @@ async def test_chat_stream_exception_yields_error(agno_service_instance):
     chunks = []
     with patch("app.services.agno_service.asyncio.sleep", new_callable=AsyncMock):
         async for chunk in agno_service_instance.chat_stream(message="Hi", session_id="s1"):
-            chunks.append(chunk)
+            chunks.append(chunk.decode())
 
-    error_chunks = [c for c in chunks if '"type": "error"' in c]
+    error_chunks = [c for c in chunks if '"type":"error"' in c]
     assert len(error_chunks) == 1
     error_data = json.loads(error_chunks[0].removeprefix("data: ").strip())
     assert "stream broke" in error_data["error"]
+
+
+def test_preview_bounds_large_values():
+    rows = [{"id": i, "name": "x" * 1000} for i in range(10_000)]
+    assert len(_preview(rows, 500)) <= 500
+    assert _preview("plain\ntext", 200) == "plain\ntext"
+    assert _preview({"query": "pump"}, 200) == "{'query': 'pump'}"
+
+
+# --- SSE batching ---
+
+
+async def _collect(gen):
+    return [item async for item in gen]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_zero_delay_yields_each_token():
+    async def events():
+        for token in ("Hel", "lo"):
+            yield RunContentEvent(content=token)
+
+    out = await _collect(_coalesce_content(events(), max_delay=0))
+    assert out == ["Hel", "lo"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_consecutive_content():
+    async def events():
+        yield RunStartedEvent()
+        for token in ("Hel", "lo ", "world"):
+            yield RunContentEvent(content=token)
+        yield RunCompletedEvent()
+
+    out = await _collect(_coalesce_content(events(), max_delay=1.0))
+    assert isinstance(out[0], RunStartedEvent)
+    assert out[1] == "Hello world"
+    assert isinstance(out[2], RunCompletedEvent)
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_after_max_delay():
+    async def events():
+        yield RunContentEvent(content="first")
+        await asyncio.sleep(0.05)
+        yield RunContentEvent(content="second")
+
+    out = await _collect(_coalesce_content(events(), max_delay=0.01))
+    assert out == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_at_max_chars():
+    async def events():
+        for _ in range(3):
+            yield RunContentEvent(content="abcd")
+
+    out = await _collect(_coalesce_content(events(), max_chars=8, max_delay=1.0))
+    assert out == ["abcdabcd", "abcd"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_emits_heartbeat_when_idle():
+    async def events():
+        await asyncio.sleep(0.05)
+        yield RunContentEvent(content="done")
+
+    out = await _collect(_coalesce_content(events(), heartbeat=0.01))
+    assert out[0] is _HEARTBEAT
+    assert out[-1] == "done"
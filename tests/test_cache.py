@@ -0,0 +1,41 @@
+"""Tests for app/core/cache.py."""
+
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_get_returns_stored_value():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    assert cache.get("missing") is None
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(maxsize=4, ttl=10)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("k", "v")
+    with patch("app.core.cache.time.monotonic", return_value=109.0):
+        assert cache.get("k") == "v"
+    with patch("app.core.cache.time.monotonic", return_value=111.0):
+        assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(maxsize=4, ttl=0)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert len(cache) == 0
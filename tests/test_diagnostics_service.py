@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
 
 from app.services.diagnostics_service import DiagnosticsService, _parse_diagnostics
 
@@ -60,7 +61,7 @@ def test_parse_diagnostics_empty():
 async def test_initialize():
     service = DiagnosticsService()
     with (
-        patch("app.services.diagnostics_service.create_search_tools") as MockDDG,
+        patch("app.services.diagnostics_service.get_search_tools") as MockDDG,
         patch("app.services.diagnostics_service.create_sql_tools"),
         patch("app.services.diagnostics_service.Agent") as MockAgent,
     ):
@@ -69,13 +70,17 @@ async def test_initialize():
     assert service._initialized is True
     MockDDG.assert_called_once()
     MockAgent.assert_called_once()
+    prompt = MockAgent.call_args.kwargs["system_message"]
+    assert prompt.startswith("You are Alex, an AI diagnostic specialist")
+    assert prompt == prompt.strip()
+    assert MockAgent.call_args.kwargs["telemetry"] is False
 
 
 @pytest.mark.asyncio
 async def test_initialize_idempotent():
     service = DiagnosticsService()
     with (
-        patch("app.services.diagnostics_service.create_search_tools"),
+        patch("app.services.diagnostics_service.get_search_tools"),
         patch("app.services.diagnostics_service.create_sql_tools"),
         patch("app.services.diagnostics_service.Agent") as MockAgent,
     ):
@@ -139,7 +144,7 @@ async def test_diagnose_generates_session_id(diagnostics_service_instance):
     )
 
     assert result["session_id"]
-    assert len(result["session_id"]) == 36
+    assert len(result["session_id"]) == 32
 
 
 @pytest.mark.asyncio
@@ -159,9 +164,7 @@ async def test_diagnose_includes_listing_id_in_agent_input(
 
 
 @pytest.mark.asyncio
-async def test_diagnose_creates_fresh_sql_tools(
-    diagnostics_service_instance, mock_sql_tools
-):
+async def test_diagnose_reuses_agent_tools(diagnostics_service_instance):
     diagnostics_service_instance.agent.arun = AsyncMock(
         return_value=RunOutput(content="Most likely: Issue 1.")
     )
@@ -170,7 +173,19 @@ async def test_diagnose_creates_fresh_sql_tools(
         message="problem", listing_id="EQP-1", session_id="s1"
     )
 
-    diagnostics_service_instance._create_sql_tools.assert_called_once()
+    diagnostics_service_instance._create_sql_tools.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_diagnose_failed_run_raises(diagnostics_service_instance):
+    diagnostics_service_instance.agent.arun = AsyncMock(
+        return_value=RunOutput(content="Connection error.", status=RunStatus.error)
+    )
+
+    with pytest.raises(RuntimeError, match="Connection error"):
+        await diagnostics_service_instance.diagnose(
+            message="broken", listing_id="EQP-1", session_id="s1"
+        )
 
 
 @pytest.mark.asyncio
@@ -22,6 +22,26 @@ async def test_health(client):
     assert resp.json() == {"status": "healthy"}
 
 
+@pytest.mark.asyncio
+async def test_health_skips_cors(client):
+    resp = await client.get("/health", headers={"Origin": "https://app.example.com"})
+    assert resp.status_code == 200
+    assert "access-control-allow-origin" not in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_chat_preflight(client):
+    resp = await client.options(
+        "/chat",
+        headers={
+            "Origin": "https://app.example.com",
+            "Access-Control-Request-Method": "POST",
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.headers["access-control-allow-origin"] == "https://app.example.com"
+
+
 @pytest.mark.asyncio
 async def test_chat(client):
     mock_result = {"response": "Hello there", "session_id": "sess-123"}
@@ -37,12 +57,64 @@ async def test_chat(client):
     assert data["session_id"] == "sess-123"
 
 
+@pytest.mark.asyncio
+async def test_chat_batch(client):
+    mock_results = [
+        {"response": "First", "session_id": "s1"},
+        {"response": "Second", "session_id": "s2"},
+    ]
+    with patch(
+        "app.main.agno_service.chat_batch", new_callable=AsyncMock, return_value=mock_results
+    ) as mock_batch:
+        resp = await client.post("/chat/batch", json={"messages": ["a", "b"]})
+    assert resp.status_code == 200
+    assert resp.json()["results"] == [
+        {"response": "<p>First</p>", "session_id": "s1"},
+        {"response": "<p>Second</p>", "session_id": "s2"},
+    ]
+    assert mock_batch.call_args.kwargs["messages"] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_returns_per_message_errors(client):
+    mock_results = [{"response": "First", "session_id": "s1"}, {"error": "model unavailable"}]
+    with patch("app.main.agno_service.chat_batch", new_callable=AsyncMock, return_value=mock_results):
+        resp = await client.post("/chat/batch", json={"messages": ["a", "b"]})
+    assert resp.status_code == 200
+    assert resp.json()["results"] == [
+        {"response": "<p>First</p>", "session_id": "s1"},
+        {"error": "model unavailable"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_rejects_oversized_batch(client):
+    resp = await client.post("/chat/batch", json={"messages": ["Hi"] * 21})
+    assert resp.status_code == 422
+    resp = await client.post("/chat/batch", json={"messages": ["x" * 8001]})
+    assert resp.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_chat_missing_message(client):
     resp = await client.post("/chat", json={})
     assert resp.status_code == 422
 
 
+@pytest.mark.asyncio
+async def test_chat_rejects_oversized_message(client):
+    with patch("app.main.agno_service.chat", new_callable=AsyncMock) as mock_chat:
+        resp = await client.post("/chat", json={"message": "x" * 8001})
+    assert resp.status_code == 422
+    mock_chat.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_chat_rejects_oversized_session_id(client):
+    resp = await client.post("/chat", json={"message": "Hi", "session_id": "s" * 129})
+    assert resp.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_chat_default_user_id(client):
     mock_result = {"response": "ok", "session_id": "s1"}
@@ -55,6 +127,18 @@ async def test_chat_default_user_id(client):
     assert call_kwargs["user_id"] == "default"
 
 
+@pytest.mark.asyncio
+async def test_chat_no_cache_header_disables_cache(client):
+    mock_result = {"response": "ok", "session_id": "s1"}
+    with patch(
+        "app.main.agno_service.chat", new_callable=AsyncMock, return_value=mock_result
+    ) as mock_chat:
+        await client.post("/chat", json={"message": "test"})
+        await client.post("/chat", json={"message": "test"}, headers={"X-No-Cache": "1"})
+    assert mock_chat.call_args_list[0].kwargs["use_cache"] is True
+    assert mock_chat.call_args_list[1].kwargs["use_cache"] is False
+
+
 @pytest.mark.asyncio
 async def test_chat_service_error(client):
     with patch(
@@ -70,7 +154,7 @@ async def test_chat_service_error(client):
 
 @pytest.mark.asyncio
 async def test_chat_stream(client):
-    async def fake_stream(message, session_id, user_id, metadata=None):
+    async def fake_stream(message, session_id, user_id, metadata=None, use_cache=True):
         yield f"data: {json.dumps({'type': 'session', 'session_id': 'sess-1'})}\n\n"
         yield f"data: {json.dumps({'type': 'content', 'content': 'Hello'})}\n\n"
         yield f"data: {json.dumps({'type': 'done', 'execution_time': 0.5})}\n\n"
@@ -0,0 +1,43 @@
+"""Tests for app/core/history.py."""
+
+from unittest.mock import patch
+
+from agno.models.message import Message
+
+from app.core.history import MESSAGE_OVERHEAD_TOKENS, count_tokens, pack_history
+
+
+def _turn(question: str, answer: str) -> list[Message]:
+    return [Message(role="user", content=question), Message(role="assistant", content=answer)]
+
+
+def test_count_tokens_estimates_without_tiktoken():
+    with patch("app.core.history._encoder", return_value=None):
+        assert count_tokens("x" * 40) == 11
+
+
+def test_pack_history_keeps_newest_turns_within_budget():
+    messages = _turn("q1", "a1") + _turn("q2", "a2") + _turn("q3", "a3")
+    per_turn = 2 * (1 + MESSAGE_OVERHEAD_TOKENS)
+    with patch("app.core.history.count_tokens", return_value=1):
+        packed = pack_history(messages, max_tokens=2 * per_turn)
+    assert [m.content for m in packed] == ["q2", "a2", "q3", "a3"]
+    assert all(m.from_history for m in packed)
+
+
+def test_pack_history_drops_tool_traffic():
+    messages = [
+        Message(role="user", content="q1"),
+        Message(role="assistant", content=None, tool_calls=[{"id": "t1", "type": "function"}]),
+        Message(role="tool", content="rows", tool_call_id="t1"),
+        Message(role="assistant", content="a1"),
+    ]
+    with patch("app.core.history._encoder", return_value=None):
+        packed = pack_history(messages, max_tokens=1000)
+    assert [(m.role, m.content) for m in packed] == [("user", "q1"), ("assistant", "a1")]
+    assert all(m.tool_calls is None for m in packed)
+
+
+def test_pack_history_empty_when_newest_turn_too_large():
+    with patch("app.core.history.count_tokens", return_value=100):
+        assert pack_history(_turn("q", "a"), max_tokens=50) == []
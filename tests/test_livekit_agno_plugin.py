@@ -0,0 +1,95 @@
+"""Tests for app/services/livekit_agno_plugin.py."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from agno.run.agent import RunContentEvent
+
+from app.services.livekit_agno_plugin import (
+    _SOFT_MIN_CHARS,
+    AgnoStream,
+    _sentence_boundary,
+    _sanitize_for_tts,
+    _soft_boundary,
+    _strip_json_blobs,
+)
+
+
+def test_sentence_boundary_skips_urls():
+    text = "See s3.amazonaws.com/manuals/pump.pdf for details"
+    assert _sentence_boundary(text) == -1
+    assert _sentence_boundary("Done. Next") == len("Done.")
+
+
+def test_sanitize_strips_markdown_and_collapses_whitespace():
+    text = "### Steps\n\n1. Drain the **hydraulic** tank\n- Check the [manual](https://x.io/m)  first"
+    assert _sanitize_for_tts(text) == "Steps Drain the hydraulic tank Check the manual first"
+    assert _sanitize_for_tts("The pump is fine. ") == "The pump is fine."
+
+
+def test_strip_json_blobs_cuts_to_last_brace():
+    assert _strip_json_blobs('Found {"a": {"b": 1}} two {x} units') == "Found  units"
+    assert _strip_json_blobs("unclosed { brace") == "unclosed { brace"
+
+
+def test_sanitize_keeps_unclosed_brackets():
+    assert _sanitize_for_tts("[a " * 2000 + "[pump](manual)") == ("[a " * 2000 + "pump").strip()
+
+
+def test_soft_boundary_ignores_short_buffers():
+    assert _soft_boundary("The pump is due soon, check the filter") == -1
+
+
+def test_soft_boundary_splits_long_clause_at_last_break():
+    text = (
+        "The excavator on site two is due for its five hundred hour service, "
+        "and the loader needs new tires, plus the"
+    )
+    idx = _soft_boundary(text)
+    assert text[:idx].endswith("new tires,")
+    assert idx >= _SOFT_MIN_CHARS
+
+
+def test_soft_boundary_keeps_unsafe_text_whole():
+    text = (
+        "Here is the manual for the hydraulic pump you asked about, "
+        "https://example.com/manual and the guide"
+    )
+    assert _soft_boundary(text) == -1
+    assert _soft_boundary('Results, ' * 10 + '{"rows": ') == -1
+
+
+async def _spoken(chunks: list[str]) -> list[str]:
+    """Run an AgnoStream over *chunks* and return what was sent to TTS."""
+    async def run(**kwargs):
+        for chunk in chunks:
+            yield RunContentEvent(content=chunk)
+
+    stream = AgnoStream.__new__(AgnoStream)  # skip LLMStream's channel/task setup
+    stream._agent = MagicMock(arun=run)
+    stream._session_id = stream._user_id = stream._send_link = None
+    stream._event_ch = MagicMock()
+    stream._get_user_input = lambda: "When is the filter due?"
+    await stream._run()
+    return [c.args[0].delta.content for c in stream._event_ch.send_nowait.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_long_sentence_clause_flushed_before_sentence_ends():
+    spoken = await _spoken([
+        "The hydraulic filter on your loader needs replacing soon, ",
+        "so plan for it before the next big job on site",
+        " this week. It is due.",
+    ])
+    assert spoken[0] == "The hydraulic filter on your loader needs replacing soon,"
+    assert spoken[-1] == "It is due."
+
+
+@pytest.mark.asyncio
+async def test_clause_not_flushed_when_sentence_so_far_is_reasoning():
+    spoken = await _spoken([
+        "The hydraulic filter on your loader needs replacing soon, ",
+        "which I found in the work_order records",
+        " for this unit. It is due.",
+    ])
+    assert spoken == ["It is due."]
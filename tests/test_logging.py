@@ -1,34 +1,83 @@
 """Tests for app/core/logging.py."""
 
+import asyncio
 import json
 import logging
 import time
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, RotatingFileHandler
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
-from app.core.logging import JsonLogFormatter, logger_hook, setup_logging
+import app.core.logging as app_logging
+from app.core.logging import (
+    TEXT_LOG_FORMAT,
+    BufferedFileHandler,
+    CachedTimeFormatter,
+    HealthCheckAccessFilter,
+    JsonLogFormatter,
+    SizeTrackingRotatingFileHandler,
+    async_logger_hook,
+    logger_hook,
+    setup_logging,
+)
 
 
 @pytest.fixture(autouse=True)
 def _reset_root_logger():
     """Reset root logger after each test to avoid cross-test pollution."""
     yield
+    app_logging._stop_listener()
     root = logging.getLogger()
     root.handlers.clear()
     root.setLevel(logging.WARNING)
 
 
+def _listener_handlers():
+    """Handlers owned by the background QueueListener."""
+    return list(app_logging._listener.handlers)
+
+
 def test_setup_logging_creates_handlers(tmp_path):
     log_file = str(tmp_path / "test.log")
     setup_logging(log_level="INFO", log_file=log_file)
 
-    root = logging.getLogger()
-    handler_types = [type(h) for h in root.handlers]
+    handler_types = [type(h) for h in _listener_handlers()]
     assert logging.StreamHandler in handler_types
-    assert RotatingFileHandler in handler_types
+    assert BufferedFileHandler in handler_types
+    buffered = next(h for h in _listener_handlers() if isinstance(h, BufferedFileHandler))
+    assert isinstance(buffered.target, RotatingFileHandler)
+
+
+def test_setup_logging_root_uses_queue_handler(tmp_path):
+    log_file = str(tmp_path / "test.log")
+    setup_logging(log_level="INFO", log_file=log_file)
+
+    root = logging.getLogger()
+    assert len(root.handlers) == 1
+    assert isinstance(root.handlers[0], QueueHandler)
+
+
+def test_setup_logging_writes_through_listener(tmp_path):
+    log_file = tmp_path / "test.log"
+    setup_logging(log_level="INFO", log_file=str(log_file))
+
+    logging.getLogger("test.queue").warning("queued %s", "message")
+    app_logging._stop_listener()
+
+    assert "queued message" in log_file.read_text()
+
+
+def test_setup_logging_per_process_names_file_by_pid(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_logging.os, "getpid", lambda: 4242)
+    setup_logging(log_level="INFO", log_file=str(tmp_path / "api.log"), per_process=True)
+
+    logging.getLogger("test.pid").warning("from worker")
+    app_logging._stop_listener()
+
+    assert "from worker" in (tmp_path / "api.4242.log").read_text()
+    assert not (tmp_path / "api.log").exists()
 
 
 def test_setup_logging_sets_level(tmp_path):
@@ -51,18 +100,62 @@ def test_setup_logging_suppresses_noisy_loggers(tmp_path):
     log_file = str(tmp_path / "test.log")
     setup_logging(log_file=log_file)
 
-    for name in ("httpx", "httpcore", "urllib3"):
+    for name in ("httpx", "httpcore", "urllib3", "openai", "websockets", "asyncio"):
         assert logging.getLogger(name).level == logging.WARNING
 
 
 def test_setup_logging_clears_previous_handlers(tmp_path):
+    log_file = str(tmp_path / "test.log")
+    setup_logging(log_level="INFO", log_file=log_file)
+    setup_logging(log_level="DEBUG", log_file=log_file)
+
+    root = logging.getLogger()
+    # One queue handler on root, and exactly 2 listener handlers (console + file), not 4
+    assert len(root.handlers) == 1
+    assert len(_listener_handlers()) == 2
+
+
+def test_setup_logging_repeat_call_is_noop(tmp_path):
     log_file = str(tmp_path / "test.log")
     setup_logging(log_file=log_file)
+    listener = app_logging._listener
+    queue_handler = logging.getLogger().handlers[0]
+
     setup_logging(log_file=log_file)
 
-    root = logging.getLogger()
-    # Should have exactly 2 handlers (console + file), not 4
-    assert len(root.handlers) == 2
+    assert app_logging._listener is listener
+    assert logging.getLogger().handlers == [queue_handler]
+
+
+def test_buffered_file_handler_batches_until_flush(tmp_path):
+    log_file = tmp_path / "buffered.log"
+    target = logging.FileHandler(str(log_file), delay=True)
+    handler = BufferedFileHandler(target=target, capacity=10, flush_interval=60)
+    try:
+        handler.handle(logging.makeLogRecord({"msg": "first", "levelno": logging.INFO}))
+        assert not log_file.exists()  # still buffered, file not yet opened
+
+        handler.handle(logging.makeLogRecord({"msg": "boom", "levelno": logging.ERROR}))
+        assert "first" in log_file.read_text()  # ERROR flushes immediately
+    finally:
+        handler.close()
+
+
+def test_size_tracking_handler_rolls_over_at_max_bytes(tmp_path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("x" * 50 + "\n")
+    handler = SizeTrackingRotatingFileHandler(
+        str(log_file), maxBytes=100, backupCount=1, delay=True
+    )
+    record = logging.makeLogRecord({"msg": "y" * 30})
+
+    handler.handle(record)  # 51 + 31 bytes: fits
+    assert not (tmp_path / "test.log.1").exists()
+    handler.handle(record)  # would reach 113: rolls over first
+    handler.close()
+
+    assert (tmp_path / "test.log.1").read_text() == "x" * 50 + "\n" + "y" * 30 + "\n"
+    assert log_file.read_text() == "y" * 30 + "\n"
 
 
 def test_setup_logging_invalid_level_defaults_to_info(tmp_path):
@@ -100,10 +193,40 @@ def test_logger_hook_truncates_long_args(caplog):
     with caplog.at_level(logging.INFO, logger="app.tools"):
         logger_hook("my_func", MagicMock(return_value=None), long_args)
 
-    for record in caplog.records:
-        if "my_func" in record.message and "args=" in record.message:
-            # The args portion should be truncated to 500 chars
-            assert len(record.message) < 600
+    record = next(r for r in caplog.records if getattr(r, "tool_name", None) == "my_func")
+    assert len(record.args_preview) < 300
+    assert "..." in record.args_preview
+
+
+def test_logger_hook_skips_result_repr_when_debug_disabled(caplog):
+    result = MagicMock()
+
+    with caplog.at_level(logging.INFO, logger="app.tools"):
+        logger_hook("my_func", MagicMock(return_value=result), {})
+
+    result.__str__.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_logger_hook_awaits_coroutine_function(caplog):
+    async def slow_fn(**kwargs):
+        await asyncio.sleep(0.05)
+        return "done"
+
+    with caplog.at_level(logging.DEBUG, logger="app.tools"):
+        result = await async_logger_hook("slow_func", slow_fn, {"x": 1})
+
+    assert result == "done"
+    record = next(r for r in caplog.records if getattr(r, "tool_name", None) == "slow_func")
+    assert record.duration_s >= 0.05
+    assert any(r.getMessage() == "Tool slow_func returned: done" for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_async_logger_hook_accepts_sync_function():
+    fn = MagicMock(return_value=42)
+    assert await async_logger_hook("my_func", fn, {"x": 1}) == 42
+    fn.assert_called_once_with(x=1)
 
 
 # --- JSON formatter ---
@@ -165,18 +288,21 @@ def test_json_formatter_includes_extra_fields():
     )
     record.tool_name = "search"
     record.duration_s = 1.234
+    record.args_preview = "{'q': 'cat 320'}"
     output = formatter.format(record)
     parsed = json.loads(output)
     assert parsed["tool_name"] == "search"
     assert parsed["duration_s"] == 1.234
+    assert parsed["args_preview"] == "{'q': 'cat 320'}"
 
 
 def test_setup_logging_json_format_uses_json_formatter(tmp_path):
     log_file = str(tmp_path / "test.log")
     setup_logging(log_level="INFO", log_file=log_file, log_format="json")
 
-    root = logging.getLogger()
-    for handler in root.handlers:
+    for handler in _listener_handlers():
+        if isinstance(handler, BufferedFileHandler):
+            handler = handler.target
         assert isinstance(handler.formatter, JsonLogFormatter)
 
 
@@ -184,12 +310,23 @@ def test_setup_logging_text_format_uses_standard_formatter(tmp_path):
     log_file = str(tmp_path / "test.log")
     setup_logging(log_level="INFO", log_file=log_file, log_format="text")
 
-    root = logging.getLogger()
-    for handler in root.handlers:
-        assert isinstance(handler.formatter, logging.Formatter)
+    for handler in _listener_handlers():
+        if isinstance(handler, BufferedFileHandler):
+            handler = handler.target
+        assert isinstance(handler.formatter, CachedTimeFormatter)
         assert not isinstance(handler.formatter, JsonLogFormatter)
 
 
+def test_cached_time_formatter_matches_standard_asctime():
+    cached = CachedTimeFormatter(TEXT_LOG_FORMAT)
+    standard = logging.Formatter(TEXT_LOG_FORMAT)
+    for created in (1700000000.123, 1700000000.987, 1700000001.5):
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "msg", None, None)
+        record.created = created
+        record.msecs = int((created - int(created)) * 1000)
+        assert cached.format(record) == standard.format(record)
+
+
 def test_logger_hook_passes_extra_fields(caplog):
     fn = MagicMock(return_value="ok")
 
@@ -201,3 +338,26 @@ def test_logger_hook_passes_extra_fields(caplog):
     record = info_records[0]
     assert record.tool_name == "search_tool"
     assert isinstance(record.duration_s, float)
+    assert record.args_preview == "{'q': 'test'}"
+
+
+def _access_record(path):
+    return logging.LogRecord(
+        "uvicorn.access", logging.INFO, __file__, 0,
+        '%s - "%s %s HTTP/%s" %d', ("127.0.0.1:5000", "GET", path, "1.1", 200), None,
+    )
+
+
+def test_health_check_filter_drops_probe_paths():
+    f = HealthCheckAccessFilter()
+    assert f.filter(_access_record("/health")) is False
+    assert f.filter(_access_record("/")) is False
+    assert f.filter(_access_record("/chat")) is True
+
+
+def test_setup_logging_installs_access_filter_once(tmp_path):
+    log_file = str(tmp_path / "test.log")
+    setup_logging(log_level="INFO", log_file=log_file)
+    setup_logging(log_level="DEBUG", log_file=log_file)
+    filters = logging.getLogger("uvicorn.access").filters
+    assert sum(isinstance(f, HealthCheckAccessFilter) for f in filters) == 1
@@ -1,8 +1,11 @@
 """Tests for equipment pre-fetch integration in AgnoService._build_context_message."""
 
 import json
+import threading
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from app.services.agno_service import AgnoService
 
 
@@ -89,3 +92,21 @@ def test_build_context_message_no_metadata():
     service = AgnoService()
     assert service._build_context_message(None) == ""
     assert service._build_context_message("") == ""
+
+
+@pytest.mark.asyncio
+async def test_chat_prefetches_off_the_event_loop(agno_service_instance):
+    """The blocking equipment lookup runs in a worker thread, not on the loop."""
+    metadata = json.dumps({"listing_id": "L1"})
+    fetch_threads = []
+
+    def fake_fetch(engine, listing_id):
+        fetch_threads.append(threading.get_ident())
+        return SAMPLE_EQUIP
+
+    with patch("app.services.agno_service.fetch_equipment_summary", side_effect=fake_fetch):
+        await agno_service_instance.chat(message="Hi", session_id="s1", metadata=metadata)
+
+    assert fetch_threads and fetch_threads[0] != threading.get_ident()
+    sent = agno_service_instance.agent.arun.call_args.kwargs["input"][-1].content
+    assert sent.startswith("[CONTEXT: Listing ID: L1")
@@ -1,8 +1,11 @@
 """Tests for app/core/retry.py."""
 
+from unittest.mock import patch
+
+import httpx
 import pytest
 
-from app.core.retry import _is_retryable, with_retry
+from app.core.retry import _is_retryable, retry_delay, with_retry
 
 
 @pytest.mark.asyncio
@@ -39,9 +42,9 @@ async def test_with_retry_raises_after_all_retries_exhausted():
 
     async def always_fail():
         calls.append(1)
-        raise RuntimeError("permanent")
+        raise ConnectionError("still down")
 
-    with pytest.raises(RuntimeError, match="permanent"):
+    with pytest.raises(ConnectionError, match="still down"):
         await with_retry(always_fail, max_retries=3, backoff=[0, 0, 0])
     assert len(calls) == 3
 
@@ -62,9 +65,9 @@ async def test_with_retry_raises_last_exception():
 
     async def different_errors():
         attempt[0] += 1
-        raise ValueError(f"error-{attempt[0]}")
+        raise TimeoutError(f"error-{attempt[0]}")
 
-    with pytest.raises(ValueError, match="error-3"):
+    with pytest.raises(TimeoutError, match="error-3"):
         await with_retry(different_errors, max_retries=3, backoff=[0, 0, 0])
 
 
@@ -74,9 +77,9 @@ async def test_with_retry_respects_max_retries():
 
     async def fail():
         calls.append(1)
-        raise RuntimeError("fail")
+        raise ConnectionError("fail")
 
-    with pytest.raises(RuntimeError):
+    with pytest.raises(ConnectionError):
         await with_retry(fail, max_retries=5, backoff=[0, 0, 0, 0, 0])
     assert len(calls) == 5
 
@@ -84,8 +87,35 @@ async def test_with_retry_respects_max_retries():
 # --- _is_retryable ---
 
 
-def test_is_retryable_plain_exception():
-    assert _is_retryable(RuntimeError("boom")) is True
+def test_is_not_retryable_plain_exception():
+    assert _is_retryable(RuntimeError("boom")) is False
+
+
+def test_is_retryable_wrapped_transport_error():
+    """SDK/Agno wrappers are seen through to the httpx error that caused them."""
+    try:
+        try:
+            raise httpx.ConnectError("connection refused")
+        except httpx.ConnectError as e:
+            raise RuntimeError("Connection error.") from e
+    except RuntimeError as wrapped:
+        assert _is_retryable(wrapped) is True
+
+
+def test_is_not_retryable_wrapped_bug():
+    """A default 502 wrapper around a non-HTTP error is judged by its cause."""
+    wrapper = Exception("Error from API")
+    wrapper.status_code = 502
+    wrapper.__cause__ = KeyError("choices")
+    assert _is_retryable(wrapper) is False
+
+
+def test_retry_delay_is_jittered_and_capped():
+    with patch("app.core.retry.random.uniform", side_effect=lambda a, b: b):
+        assert retry_delay(0) == 0.4
+        assert retry_delay(5) == 1.6
+        assert retry_delay(0, backoff=[5]) == 2.0
+    assert retry_delay(1, backoff=[0, 0]) == 0
 
 
 def test_is_retryable_server_error():
@@ -0,0 +1,104 @@
+"""Tests for app/tools/search.py."""
+
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+
+from agno.tools.function import FunctionCall
+from agno.tools.tavily import TavilyTools
+
+from app.core.logging import async_logger_hook
+from app.tools import search
+from app.tools.search import CachedTavilyTools, create_search_tools, get_search_tools
+
+
+@pytest.fixture(autouse=True)
+def _clear_search_cache():
+    search._search_cache.clear()
+    yield
+    search._search_cache.clear()
+
+
+def _tool_with_client(response):
+    tool = create_search_tools()
+    tool.client = MagicMock()
+    tool.client.search.return_value = response
+    return tool
+
+
+def test_create_search_tools_returns_cached_tavily():
+    assert isinstance(create_search_tools(), CachedTavilyTools)
+
+
+def test_get_search_tools_is_shared():
+    assert get_search_tools() is get_search_tools()
+    assert isinstance(get_search_tools(), CachedTavilyTools)
+
+
+def test_repeat_query_is_served_from_cache():
+    tool = _tool_with_client({"results": [
+        {"title": "CAT 320 manual", "url": "https://example.com", "content": "Specs", "score": 0.9},
+    ]})
+    first = tool.web_search_using_tavily("CAT 320  manual")
+    second = tool.web_search_using_tavily("cat 320 manual")
+    assert second == first
+    tool.client.search.assert_called_once()
+
+
+def test_cache_is_shared_across_instances():
+    response = {"results": []}
+    _tool_with_client(response).web_search_using_tavily("pump", max_results=3)
+    other = _tool_with_client(response)
+    other.web_search_using_tavily("pump", max_results=3)
+    other.client.search.assert_not_called()
+
+
+def test_different_max_results_is_a_separate_entry():
+    tool = _tool_with_client({"results": []})
+    tool.web_search_using_tavily("pump", max_results=3)
+    tool.web_search_using_tavily("pump", max_results=5)
+    assert tool.client.search.call_count == 2
+
+
+def test_tool_description_matches_tavily():
+    assert (
+        CachedTavilyTools.web_search_using_tavily.__doc__
+        == TavilyTools.web_search_using_tavily.__doc__
+    )
+
+
+def test_async_search_registered_with_sync_name():
+    tool = create_search_tools()
+    assert set(tool.async_functions) == set(tool.functions) == {"web_search_using_tavily"}
+
+
+@pytest.mark.asyncio
+async def test_async_search_shares_cache_with_sync():
+    tool = _tool_with_client({"results": []})
+    tool.web_search_using_tavily("hydraulic pump")
+    await tool.aweb_search_using_tavily("hydraulic pump")
+    tool.client.search.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_search_through_tool_hook_logs_awaited_result(caplog):
+    tool = _tool_with_client({"results": []})
+    function = tool.async_functions["web_search_using_tavily"].model_copy()
+    function.tool_hooks = [async_logger_hook]
+    function.process_entrypoint()
+    call = FunctionCall(function=function, arguments={"query": "hydraulic pump"})
+
+    with caplog.at_level(logging.DEBUG, logger="app.tools"):
+        await call.aexecute()
+
+    assert call.result == "# hydraulic pump\n\n"
+    tool.client.search.assert_called_once()
+    assert any(
+        r.getMessage() == f"Tool web_search_using_tavily returned: {call.result}" for r in caplog.records
+    )
+
+
+def test_client_session_keeps_a_larger_pool():
+    adapter = create_search_tools().client.session.get_adapter("https://api.tavily.com")
+    assert adapter._pool_maxsize == search.SEARCH_POOL_SIZE
@@ -1,194 +1,346 @@
 """Tests for SendDocumentTool in app/tools/send_document.py."""
 
-from unittest.mock import MagicMock, patch
+import json
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
+from agno.tools.function import FunctionCall
 
-from app.tools.send_document import SendDocumentTool
+from app.core.logging import async_logger_hook
+from app.tools import send_document
+from app.tools.send_document import (
+    BREAKER_COOLDOWN,
+    BREAKER_THRESHOLD,
+    WEBHOOK_MAX_CONNECTIONS,
+    SendDocumentTool,
+)
+
+WEBHOOK_URL = "https://example.com/webhook"
+
+
+class FakeWebhook:
+    """``httpx.MockTransport`` handler that records requests and replays replies.
+
+    A reply is a status code, or an exception to raise; the last one repeats.
+    """
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.replies: list = [200]
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return httpx.Response(reply)
+
+    def payload(self, index: int = -1) -> dict:
+        return json.loads(self.requests[index].content)
 
 
 @pytest.fixture
-def tool():
-    return SendDocumentTool(webhook_url="https://example.com/webhook")
+def webhook():
+    return FakeWebhook()
+
+
+def _tool(webhook, **kwargs):
+    transport = httpx.MockTransport(webhook)
+    tool = SendDocumentTool(webhook_url=WEBHOOK_URL, client=httpx.Client(transport=transport), **kwargs)
+    tool._async_client = httpx.AsyncClient(transport=transport)
+    return tool
 
 
-def test_send_document_success(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+@pytest.fixture
+def tool(webhook):
+    return _tool(webhook)
+
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        result = tool.send_document(
-            title="Kubota SVL97-2 Guide",
-            url="https://example.com/guide.pdf",
-            recipient="user1",
-        )
+def test_send_document_success(tool, webhook):
+    result = tool.send_document(
+        title="Kubota SVL97-2 Guide",
+        url="https://example.com/guide.pdf",
+        recipient="user1",
+    )
 
     assert "sent successfully" in result
-    mock_post.assert_called_once()
-    inner = mock_post.call_args.kwargs["json"]["json"]
+    assert len(webhook.requests) == 1
+    inner = webhook.payload()["json"]
     assert inner["title"] == "Kubota SVL97-2 Guide"
     assert inner["url"] == "https://example.com/guide.pdf"
     assert inner["recipient"] == "user1"
     assert "timestamp" in inner
 
 
-def test_send_document_payload_format(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+def test_send_document_payload_format(tool, webhook):
+    tool.send_document(title="Test Doc", url="https://example.com/doc.pdf")
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="Test Doc", url="https://example.com/doc.pdf")
-
-    call_kwargs = mock_post.call_args
-    assert call_kwargs.args[0] == "https://example.com/webhook"
-    assert call_kwargs.kwargs["timeout"] == 10.0
-    payload = call_kwargs.kwargs["json"]
+    request = webhook.requests[0]
+    assert request.method == "POST"
+    assert str(request.url) == WEBHOOK_URL
+    assert request.headers["content-type"] == "application/json"
+    payload = webhook.payload()
     # tRPC wrapper
     assert set(payload.keys()) == {"json"}
     assert set(payload["json"].keys()) == {"title", "url", "recipient", "workOrderId", "sessionId", "timestamp"}
 
 
-def test_send_document_timeout(tool):
-    with patch("app.tools.send_document.time.sleep"), patch(
-        "app.tools.send_document.httpx.post",
-        side_effect=httpx.TimeoutException("timeout"),
-    ) as mock_post:
+def test_send_document_timeout(tool, webhook):
+    webhook.replies = [httpx.TimeoutException("timeout")]
+
+    with patch("app.tools.send_document.time.sleep"):
         result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
 
     assert "timed out" in result
-    assert mock_post.call_count == 3  # retried 3 times
+    assert len(webhook.requests) == 3  # retried 3 times
 
 
-def test_send_document_http_error(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 500
-    mock_response.request = MagicMock()
-    mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
-        "error", request=MagicMock(), response=mock_response
-    )
+def test_send_document_http_error(tool, webhook):
+    webhook.replies = [500]
 
-    with patch("app.tools.send_document.time.sleep"), patch(
-        "app.tools.send_document.httpx.post", return_value=mock_response
-    ) as mock_post:
+    with patch("app.tools.send_document.time.sleep"):
         result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
 
     assert "status 500" in result
-    assert mock_post.call_count == 3  # retried 3 times on 5xx
+    assert len(webhook.requests) == 3  # retried 3 times on 5xx
+
 
+def test_send_document_connection_error(tool, webhook):
+    webhook.replies = [httpx.ConnectError("refused")]
 
-def test_send_document_connection_error(tool):
-    with patch("app.tools.send_document.time.sleep"), patch(
-        "app.tools.send_document.httpx.post",
-        side_effect=httpx.ConnectError("refused"),
-    ) as mock_post:
+    with patch("app.tools.send_document.time.sleep"):
         result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
 
-    assert "could not reach" in result
-    assert mock_post.call_count == 3  # retried 3 times
+    assert "could not reach the delivery service after 2 attempts" in result
+    assert len(webhook.requests) == 2  # refused connections are retried once
 
 
-def test_retry_succeeds_on_second_attempt(tool):
+def test_retry_succeeds_on_second_attempt(tool, webhook):
     """Server error on first attempt, success on second."""
-    fail_response = MagicMock()
-    fail_response.status_code = 502
-    fail_response.request = MagicMock()
-    ok_response = MagicMock()
-    ok_response.status_code = 200
-    ok_response.raise_for_status = MagicMock()
-
-    with patch("app.tools.send_document.time.sleep"), patch(
-        "app.tools.send_document.httpx.post",
-        side_effect=[fail_response, ok_response],
-    ) as mock_post:
+    webhook.replies = [502, 200]
+
+    with patch("app.tools.send_document.time.sleep"):
         result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
 
     assert "sent successfully" in result
-    assert mock_post.call_count == 2
+    assert len(webhook.requests) == 2
 
 
-def test_no_retry_on_client_error(tool):
+def test_no_retry_on_client_error(tool, webhook):
     """4xx errors should not be retried."""
-    mock_response = MagicMock()
-    mock_response.status_code = 400
-    mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
-        "bad request", request=MagicMock(), response=mock_response
-    )
+    webhook.replies = [400]
 
-    with patch("app.tools.send_document.time.sleep") as mock_sleep, patch(
-        "app.tools.send_document.httpx.post", return_value=mock_response
-    ) as mock_post:
+    with patch("app.tools.send_document.time.sleep") as mock_sleep:
         result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
 
     assert "status 400" in result
-    assert mock_post.call_count == 1  # no retry
+    assert len(webhook.requests) == 1  # no retry
     mock_sleep.assert_not_called()
 
 
+def test_missing_title_rejected_without_request(tool, webhook):
+    result = tool.send_document(title="", url="https://example.com/g.pdf")
+
+    assert "title is required" in result
+    assert webhook.requests == []
+
+
+@pytest.mark.parametrize("url", ["", "   ", "example.com/g.pdf", "ftp://example.com/g.pdf", "http://[::1"])
+def test_bad_url_rejected_without_request(tool, webhook, url):
+    result = tool.send_document(title="Guide", url=url)
+
+    assert "must start with http" in result
+    assert webhook.requests == []
+
+
+def test_url_scheme_is_case_insensitive(tool, webhook):
+    result = tool.send_document(title="Guide", url="HTTPS://example.com/g.pdf")
+
+    assert "sent successfully" in result
+    assert webhook.payload()["json"]["url"] == "HTTPS://example.com/g.pdf"
+
+
+def test_url_surrounding_whitespace_is_stripped(tool, webhook):
+    result = tool.send_document(title="Guide", url="  https://example.com/g.pdf\n")
+
+    assert "sent successfully" in result
+    assert webhook.payload()["json"]["url"] == "https://example.com/g.pdf"
+
+
+@pytest.mark.asyncio
+async def test_asend_document_strips_url(tool, webhook):
+    result = await tool.asend_document(title="Guide", url=" Http://example.com/g.pdf ")
+
+    assert "sent successfully" in result
+    assert webhook.payload()["json"]["url"] == "Http://example.com/g.pdf"
+
+
+def test_circuit_opens_after_consecutive_failures(tool, webhook):
+    webhook.replies = [httpx.ConnectError("refused")]
+
+    with patch("app.tools.send_document.time.sleep"):
+        for _ in range(BREAKER_THRESHOLD):
+            tool.send_document(title="Guide", url="https://example.com/g.pdf")
+        sent = len(webhook.requests)
+        result = tool.send_document(title="Guide", url="https://example.com/g.pdf")
+
+    assert "delivery service is unavailable" in result
+    assert len(webhook.requests) == sent  # short-circuited, no request made
+
+
+def test_circuit_half_open_after_cooldown(tool, webhook):
+    webhook.replies = [httpx.ConnectError("refused")]
+
+    with patch("app.tools.send_document.time") as mock_time:
+        mock_time.monotonic.return_value = 1000.0
+        for _ in range(BREAKER_THRESHOLD):
+            tool.send_document(title="Guide", url="https://example.com/g.pdf")
+
+        # Trial send after the cooldown fails: the circuit re-opens at once
+        mock_time.monotonic.return_value = 1000.0 + BREAKER_COOLDOWN
+        sent = len(webhook.requests)
+        tool.send_document(title="Guide", url="https://example.com/g.pdf")
+        assert len(webhook.requests) > sent
+        sent = len(webhook.requests)
+        assert "unavailable" in tool.send_document(title="Guide", url="https://example.com/g.pdf")
+        assert len(webhook.requests) == sent
+
+        # Next trial succeeds: the circuit closes
+        mock_time.monotonic.return_value = 1000.0 + 2 * BREAKER_COOLDOWN
+        webhook.replies = [200]
+        assert "sent successfully" in tool.send_document(title="Guide", url="https://example.com/g.pdf")
+        assert "sent successfully" in tool.send_document(title="Guide", url="https://example.com/g.pdf")
+
+
 def test_tool_registers_send_document():
-    tool = SendDocumentTool(webhook_url="https://example.com/webhook")
+    tool = SendDocumentTool(webhook_url=WEBHOOK_URL)
     func_names = [f.name for f in tool.functions.values()]
     assert "send_document" in func_names
 
 
-def test_webhook_secret_in_payload_when_provided():
-    tool = SendDocumentTool(webhook_url="https://example.com/webhook", webhook_secret="my-secret-key")
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+def test_async_variant_registered_with_sync_name(tool):
+    assert set(tool.async_functions) == {"send_document"}
+    assert tool.asend_document.__doc__ == tool.send_document.__doc__
+
+
+@pytest.mark.asyncio
+async def test_asend_document_success(tool, webhook):
+    result = await tool.asend_document(title="Guide", url="https://example.com/g.pdf")
+    await tool.asend_document(title="Guide 2", url="https://example.com/g2.pdf")
+
+    assert "sent successfully" in result
+    assert len(webhook.requests) == 2
+    assert str(webhook.requests[-1].url) == WEBHOOK_URL
+    assert webhook.payload()["json"]["title"] == "Guide 2"
+
+
+@pytest.mark.asyncio
+async def test_asend_document_through_tool_hook_logs_awaited_result(tool, webhook, caplog):
+    function = tool.async_functions["send_document"].model_copy()
+    function.tool_hooks = [async_logger_hook]
+    function.process_entrypoint()
+    call = FunctionCall(function=function, arguments={"title": "Guide", "url": "https://example.com/g.pdf"})
+
+    with caplog.at_level(logging.DEBUG, logger="app.tools"):
+        await call.aexecute()
+
+    assert call.result == "Document 'Guide' has been sent successfully."
+    assert len(webhook.requests) == 1
+    assert any(r.getMessage() == f"Tool send_document returned: {call.result}" for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_asend_document_backs_off_without_blocking(tool, webhook):
+    webhook.replies = [httpx.ConnectError("refused"), 200]
+
+    with (
+        patch("app.tools.send_document.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
+        patch("app.tools.send_document.time.sleep") as mock_time_sleep,
+    ):
+        result = await tool.asend_document(title="Guide", url="https://example.com/g.pdf")
+
+    assert "sent successfully" in result
+    mock_sleep.assert_awaited_once()
+    assert 1 <= mock_sleep.call_args.args[0] <= 2  # jittered first backoff
+    mock_time_sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_client_created_once():
+    tool = SendDocumentTool(webhook_url=WEBHOOK_URL)
+
+    with patch("app.tools.send_document.httpx.AsyncClient") as MockClient:
+        MockClient.return_value.post = AsyncMock(return_value=MagicMock(status_code=200))
+        await tool.asend_document(title="A", url="https://example.com/a.pdf")
+        await tool.asend_document(title="B", url="https://example.com/b.pdf")
+
+    MockClient.assert_called_once()  # one kept-alive client across sends
+
+
+@pytest.mark.asyncio
+async def test_default_client_shared_across_tools():
+    send_document._default_client.cache_clear()
+    first = SendDocumentTool(webhook_url=WEBHOOK_URL)
+    second = SendDocumentTool(webhook_url=WEBHOOK_URL)
+
+    try:
+        with patch("app.tools.send_document.httpx.Client") as MockClient:
+            MockClient.return_value.post.return_value = MagicMock(status_code=200)
+            first.send_document(title="A", url="https://example.com/a.pdf")
+            second.send_document(title="B", url="https://example.com/b.pdf")
+            await first.aclose()
+
+        MockClient.assert_called_once()
+        assert MockClient.call_args.kwargs["timeout"] == 10.0
+        assert MockClient.call_args.kwargs["limits"].max_connections == WEBHOOK_MAX_CONNECTIONS
+        assert MockClient.return_value.post.call_count == 2
+        MockClient.return_value.close.assert_not_called()  # shared, not the tool's to close
+    finally:
+        send_document._default_client.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_accepts_injected_client(webhook):
+    client = httpx.Client(transport=httpx.MockTransport(webhook))
+    tool = SendDocumentTool(webhook_url=WEBHOOK_URL, client=client)
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="Doc", url="https://example.com/doc.pdf")
+    assert "sent successfully" in tool.send_document(title="Doc", url="https://example.com/doc.pdf")
+    await tool.aclose()
 
-    inner = mock_post.call_args.kwargs["json"]["json"]
-    assert inner["webhookSecret"] == "my-secret-key"
+    assert len(webhook.requests) == 1
+    assert tool._client() is client
+    assert not client.is_closed  # owned by the caller
 
 
-def test_no_webhook_secret_in_payload_when_not_provided(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+def test_webhook_secret_in_payload_when_provided(webhook):
+    tool = _tool(webhook, webhook_secret="my-secret-key")
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="Doc", url="https://example.com/doc.pdf")
+    tool.send_document(title="Doc", url="https://example.com/doc.pdf")
 
-    inner = mock_post.call_args.kwargs["json"]["json"]
-    assert "webhookSecret" not in inner
+    assert webhook.payload()["json"]["webhookSecret"] == "my-secret-key"
 
 
-def test_target_included_when_provided(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+def test_no_webhook_secret_in_payload_when_not_provided(tool, webhook):
+    tool.send_document(title="Doc", url="https://example.com/doc.pdf")
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="PM Guide", url="https://example.com/pm.pdf", target="preventive-maintenance")
+    assert "webhookSecret" not in webhook.payload()["json"]
 
-    inner = mock_post.call_args.kwargs["json"]["json"]
-    assert inner["target"] == "preventive-maintenance"
 
+def test_target_included_when_provided(tool, webhook):
+    tool.send_document(title="PM Guide", url="https://example.com/pm.pdf", target="preventive-maintenance")
 
-def test_target_omitted_when_empty(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
+    assert webhook.payload()["json"]["target"] == "preventive-maintenance"
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="Doc", url="https://example.com/doc.pdf")
 
-    inner = mock_post.call_args.kwargs["json"]["json"]
-    assert "target" not in inner
+def test_target_omitted_when_empty(tool, webhook):
+    tool.send_document(title="Doc", url="https://example.com/doc.pdf")
 
+    assert "target" not in webhook.payload()["json"]
 
-def test_default_recipient_is_empty(tool):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.raise_for_status = MagicMock()
 
-    with patch("app.tools.send_document.httpx.post", return_value=mock_response) as mock_post:
-        tool.send_document(title="Doc", url="https://example.com/doc.pdf")
+def test_default_recipient_is_empty(tool, webhook):
+    tool.send_document(title="Doc", url="https://example.com/doc.pdf")
 
-    inner = mock_post.call_args.kwargs["json"]["json"]
-    assert inner["recipient"] == ""
+    assert webhook.payload()["json"]["recipient"] == ""
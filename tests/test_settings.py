@@ -0,0 +1,56 @@
+"""Tests for app/config/settings.py."""
+
+import importlib
+import os
+
+from app.config.settings import DB_MAX_OVERFLOW, DB_MIN_CONNECTIONS, Settings, get_settings, settings
+
+
+def test_db_engine_is_cached():
+    """Repeated access returns the same engine (one shared pool)."""
+    s = Settings()
+    assert s.db_engine is s.db_engine
+
+
+def test_get_settings_returns_module_singleton():
+    assert get_settings() is get_settings()
+    assert get_settings() is settings
+
+
+def test_worker_count_prefers_explicit_setting():
+    assert Settings(WORKERS=3).worker_count == 3
+
+
+def test_worker_count_auto_uses_available_cpus(monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1, 2, 3}, raising=False)
+    assert Settings(WORKERS=0).worker_count == 4
+
+
+def test_io_threads_default_to_db_pool_capacity():
+    s = Settings(WORKERS=2, MAX_CONCURRENT_SESSIONS=10, IO_THREADS=0)
+    assert s.io_thread_count == s.db_pool_size + s.db_max_overflow == 15
+    assert Settings(IO_THREADS=8).io_thread_count == 8
+
+
+def test_single_process_gets_the_whole_db_budget(monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    s = Settings(WORKERS=0, MAX_CONCURRENT_SESSIONS=10)
+    assert s.api_process_count == 1  # CPU count alone doesn't mean several processes
+    assert (s.db_pool_size, s.db_max_overflow) == (10, DB_MAX_OVERFLOW)
+
+
+def test_db_budget_is_split_across_workers():
+    s = Settings(WORKERS=16, MAX_CONCURRENT_SESSIONS=10)
+    assert (s.db_pool_size, s.db_max_overflow) == (DB_MIN_CONNECTIONS, DB_MIN_CONNECTIONS)
+    assert s.io_thread_count == 2 * DB_MIN_CONNECTIONS
+    s = Settings(WORKERS=4, MAX_CONCURRENT_SESSIONS=10)
+    assert 4 * (s.db_pool_size + s.db_max_overflow) <= 10 + DB_MAX_OVERFLOW + 4
+
+
+def test_services_share_one_engine():
+    """Chat history aside, every Turso consumer draws from the same pool."""
+    agno_module = importlib.import_module("app.services.agno_service")
+    diagnostics_module = importlib.import_module("app.services.diagnostics_service")
+
+    assert agno_module.ENGINE is settings.db_engine
+    assert diagnostics_module.ENGINE is settings.db_engine
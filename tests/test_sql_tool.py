@@ -1,11 +1,29 @@
 """Tests for app/tools/sql_tool.py — ReadOnlySQLTools and fetch_equipment_summary."""
 
+import logging
 from unittest.mock import MagicMock, patch
 
 import pytest
+from agno.tools.function import FunctionCall
 from sqlalchemy import Engine
 
-from app.tools.sql_tool import ReadOnlySQLTools, create_sql_tools, fetch_equipment_summary
+from app.core.logging import async_logger_hook
+from app.tools import sql_tool
+from app.tools.sql_tool import (
+    ReadOnlySQLTools,
+    _is_stale_connection,
+    create_sql_tools,
+    fetch_equipment_summary,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_sql_caches():
+    sql_tool._query_cache.clear()
+    sql_tool._schema_cache.clear()
+    yield
+    sql_tool._query_cache.clear()
+    sql_tool._schema_cache.clear()
 
 
 # --- ReadOnlySQLTools ---
@@ -23,6 +41,97 @@ def test_run_sql_blocks_delete():
         tool.run_sql("DELETE FROM listing WHERE id = '1'")
 
 
+@pytest.mark.asyncio
+async def test_async_run_sql_query_blocks_insert():
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    result = await tool.arun_sql_query("INSERT INTO listing VALUES ('x')")
+    assert "read-only" in result.lower()
+
+
+def test_async_tools_registered_with_sync_names():
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    assert set(tool.async_functions) == set(tool.functions)
+
+
+@pytest.mark.asyncio
+async def test_async_tool_hook_logs_awaited_result(caplog):
+    """In async runs the tool hook gets a coroutine function; its result is awaited, not logged as a coroutine."""
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    function = tool.async_functions["run_sql_query"].model_copy()
+    function.tool_hooks = [async_logger_hook]
+    function.process_entrypoint()
+    call = FunctionCall(function=function, arguments={"query": "SELECT id FROM listing"})
+
+    with (
+        patch("agno.tools.sql.SQLTools.run_sql_query", return_value='[{"id": 1}]'),
+        caplog.at_level(logging.DEBUG, logger="app.tools"),
+    ):
+        await call.aexecute()
+
+    assert call.result == '[{"id": 1}]'
+    assert any(r.getMessage() == 'Tool run_sql_query returned: [{"id": 1}]' for r in caplog.records)
+
+
+def test_repeat_select_is_served_from_cache():
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    with patch("agno.tools.sql.SQLTools.run_sql_query", return_value='[{"id": 1}]') as run:
+        first = tool.run_sql_query("SELECT id FROM listing;")
+        second = tool.run_sql_query("  SELECT id FROM listing  ")
+        tool.run_sql_query("SELECT id FROM listing", limit=5)
+    assert first == second == '[{"id": 1}]'
+    assert run.call_count == 2  # different limit is a separate entry
+
+
+def test_failed_query_is_not_cached():
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    with patch(
+        "agno.tools.sql.SQLTools.run_sql_query", return_value="Error running query: timeout"
+    ) as run:
+        tool.run_sql_query("SELECT 1")
+        tool.run_sql_query("SELECT 1")
+    assert run.call_count == 2
+
+
+def test_run_sql_query_retries_expired_stream():
+    """A stale Turso stream is retried on a fresh connection, not returned as an error."""
+    engine = MagicMock(spec=Engine)
+    tool = ReadOnlySQLTools(db_engine=engine)
+    with patch(
+        "agno.tools.sql.SQLTools.run_sql",
+        side_effect=[RuntimeError("STREAM_EXPIRED: stream not found"), [{"id": 1}]],
+    ) as run:
+        result = tool.run_sql_query("SELECT id FROM listing")
+    assert result == '[{"id": 1}]'
+    assert run.call_count == 2
+    engine.dispose.assert_called_once()
+
+
+@pytest.mark.parametrize("error", ["no such table", "no such column: downstream_id"])
+def test_run_sql_other_errors_not_retried(error):
+    engine = MagicMock(spec=Engine)
+    tool = ReadOnlySQLTools(db_engine=engine)
+    with patch("agno.tools.sql.SQLTools.run_sql", side_effect=RuntimeError(error)) as run:
+        with pytest.raises(RuntimeError, match=error):
+            tool.run_sql("SELECT * FROM nope")
+    assert run.call_count == 1
+    engine.dispose.assert_not_called()
+
+
+@pytest.mark.parametrize("error", ["STREAM_EXPIRED", "stream not found", "Stream is closed"])
+def test_is_stale_connection_matches_closed_streams(error):
+    assert _is_stale_connection(RuntimeError(error))
+
+
+def test_describe_table_is_cached():
+    tool = ReadOnlySQLTools(db_engine=MagicMock(spec=Engine))
+    with patch("sqlalchemy.inspect") as inspect:
+        inspect.return_value.get_columns.return_value = [{"name": "id", "type": "TEXT"}]
+        first = tool.describe_table("listing")
+        second = tool.describe_table("listing")
+    assert first == second == '[{"name": "id", "type": "TEXT"}]'
+    inspect.assert_called_once()
+
+
 def test_create_sql_tools_returns_readonly():
     tools = create_sql_tools(db_engine=MagicMock(spec=Engine))
     assert isinstance(tools, ReadOnlySQLTools)